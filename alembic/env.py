@@ -22,6 +22,7 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 
 from db.base import BaseClass # noqa: F401
+from db.partitioning import is_partition_name
 target_metadata = BaseClass.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -44,6 +45,17 @@ def get_url():
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # partitions of check and productcheck are not in the metadata, they are managed by
+    # scripts/manage_partitions.py and must not be dropped by autogenerated revisions
+    if type_ == "table" and reflected and compare_to is None and is_partition_name(name):
+        return False
+    # postgres keeps a copy of a foreign key to a partitioned table for every partition of that table
+    if type_ == "foreign_key_constraint" and reflected and is_partition_name(object.referred_table.name):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -60,6 +72,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -85,7 +98,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,46 @@
+"""persisted check totals
+
+Revision ID: 3f1c9a7b2e40
+Revises: d8aedfc53506
+Create Date: 2026-10-18 10:12:41.503217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7b2e40'
+down_revision: Union[str, None] = 'd8aedfc53506'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('check', sa.Column('total', sa.Float(), nullable=True))
+    op.add_column('check', sa.Column('rest', sa.Float(), nullable=True))
+
+    # backfill existing checks from their line items
+    op.execute(
+        """
+        UPDATE "check"
+        SET total = totals.total, rest = "check".amount - totals.total
+        FROM (
+            SELECT check_id, SUM(price * quantity) AS total
+            FROM productcheck
+            GROUP BY check_id
+        ) AS totals
+        WHERE totals.check_id = "check".check_id
+        """
+    )
+    op.execute('UPDATE "check" SET total = 0, rest = amount WHERE total IS NULL')
+
+    op.alter_column('check', 'total', nullable=False)
+    op.alter_column('check', 'rest', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('check', 'rest')
+    op.drop_column('check', 'total')
@@ -0,0 +1,38 @@
+"""check read path indexes
+
+Revision ID: 8b2d4e6f1a93
+Revises: 3f1c9a7b2e40
+Create Date: 2026-10-18 11:03:17.284105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4e6f1a93'
+down_revision: Union[str, None] = '3f1c9a7b2e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY does not lock writes, but can not run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_productcheck_check_id', 'productcheck', ['check_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_check_customer_id_created_at', 'check', ['customer_id', 'created_at', 'check_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_check_customer_id_created_at', table_name='check', postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index('ix_productcheck_check_id', table_name='productcheck', postgresql_concurrently=True, if_exists=True)
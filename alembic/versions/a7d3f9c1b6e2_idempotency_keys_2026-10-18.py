@@ -0,0 +1,38 @@
+"""idempotency keys
+
+Revision ID: a7d3f9c1b6e2
+Revises: c4e8a1d2f7b5
+Create Date: 2026-10-18 15:21:09.731842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f9c1b6e2'
+down_revision: Union[str, None] = 'c4e8a1d2f7b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'idempotencykey',
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('fingerprint', sa.LargeBinary(length=32), nullable=False),
+        sa.Column('status_code', sa.SmallInteger(), nullable=True),
+        sa.Column('response_body', sa.LargeBinary(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['user.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('customer_id', 'key'),
+    )
+    op.create_index('ix_idempotencykey_expires_at', 'idempotencykey', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_idempotencykey_expires_at', table_name='idempotencykey')
+    op.drop_table('idempotencykey')
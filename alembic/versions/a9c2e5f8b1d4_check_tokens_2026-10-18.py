@@ -0,0 +1,40 @@
+"""check tokens
+
+Revision ID: a9c2e5f8b1d4
+Revises: d1f4b7a2c9e3
+Create Date: 2026-10-18 23:27:51.803146
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c2e5f8b1d4'
+down_revision: Union[str, None] = 'd1f4b7a2c9e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'checktoken',
+        sa.Column('token', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('check_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['check_id', 'created_at'], ['check.check_id', 'check.created_at'], ondelete='CASCADE', onupdate='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('token'),
+    )
+    op.execute('INSERT INTO checktoken (token, check_id, created_at) SELECT token, check_id, created_at FROM "check"')
+    # tokens are unique by checktoken, the unique index of every monthly partition is not maintained anymore
+    op.drop_constraint('check_token_created_at_key', 'check', type_='unique')
+
+
+def downgrade() -> None:
+    op.create_unique_constraint('check_token_created_at_key', 'check', ['token', 'created_at'])
+    op.drop_table('checktoken')
@@ -0,0 +1,40 @@
+"""check archive
+
+Revision ID: b3e7d2a9c4f1
+Revises: f2a6c9e3d1b8
+Create Date: 2026-10-18 20:12:47.518306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e7d2a9c4f1'
+down_revision: Union[str, None] = 'f2a6c9e3d1b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'checkarchive',
+        sa.Column('check_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('token', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['user.user_id'], ),
+        sa.PrimaryKeyConstraint('check_id'),
+        sa.UniqueConstraint('token'),
+    )
+    op.create_index('ix_checkarchive_customer_id', 'checkarchive', ['customer_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_checkarchive_customer_id', table_name='checkarchive')
+    op.drop_table('checkarchive')
@@ -0,0 +1,37 @@
+"""product name trigram index
+
+Revision ID: c4e8a1d2f7b5
+Revises: 8b2d4e6f1a93
+Create Date: 2026-10-18 14:21:45.519302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1d2f7b5'
+down_revision: Union[str, None] = '8b2d4e6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # pg_trgm is a trusted extension, the owner of the database may create it
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CREATE INDEX CONCURRENTLY does not lock writes, but can not run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_productcheck_name_trgm', 'productcheck', ['name'],
+            unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_productcheck_name_trgm', table_name='productcheck', postgresql_concurrently=True, if_exists=True
+        )
+    # the extension is left installed, other objects of the database may use it
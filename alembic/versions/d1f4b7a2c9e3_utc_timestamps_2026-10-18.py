@@ -0,0 +1,36 @@
+"""utc timestamps
+
+Revision ID: d1f4b7a2c9e3
+Revises: b3e7d2a9c4f1
+Create Date: 2026-10-18 22:41:09.274518
+
+Timestamps written by now() hold the time of the TimeZone of the session, they are converted to UTC
+as new rows store timezone('UTC', now()). Run the migration with the TimeZone the rows were written with,
+the server default unless clients set their own. Nothing is rewritten on servers running in UTC.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f4b7a2c9e3'
+down_revision: Union[str, None] = 'b3e7d2a9c4f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# line items follow created_at of their checks by ON UPDATE CASCADE, rows move to the partition of their new month
+COLUMNS = [('"user"', 'create_date'), ('"check"', 'created_at'), ('checkarchive', 'created_at'),
+           ('checkarchive', 'archived_at')]
+
+
+def upgrade() -> None:
+    for table, column in COLUMNS:
+        converted = f"timezone('UTC', {column} AT TIME ZONE current_setting('TimeZone'))"
+        op.execute(f"UPDATE {table} SET {column} = {converted} WHERE {column} <> {converted}")
+
+
+def downgrade() -> None:
+    for table, column in COLUMNS:
+        converted = f"timezone(current_setting('TimeZone'), {column} AT TIME ZONE 'UTC')"
+        op.execute(f"UPDATE {table} SET {column} = {converted} WHERE {column} <> {converted}")
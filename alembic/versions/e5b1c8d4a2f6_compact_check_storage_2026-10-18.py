@@ -0,0 +1,63 @@
+"""compact check storage
+
+Revision ID: e5b1c8d4a2f6
+Revises: a7d3f9c1b6e2
+Create Date: 2026-10-18 16:40:52.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1c8d4a2f6'
+down_revision: Union[str, None] = 'a7d3f9c1b6e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # every ALTER TABLE rewrites the table once under an ACCESS EXCLUSIVE lock, so the changes
+    # of a table are made by a single statement
+    op.execute(
+        """
+        ALTER TABLE "check"
+            DROP COLUMN url,
+            ALTER COLUMN token TYPE uuid USING token::uuid,
+            ALTER COLUMN amount TYPE numeric(12, 2) USING round(amount::numeric, 2),
+            ALTER COLUMN total TYPE numeric(12, 2) USING round(total::numeric, 2),
+            ALTER COLUMN rest TYPE numeric(12, 2) USING round(rest::numeric, 2)
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE productcheck
+            ALTER COLUMN quantity TYPE integer USING round(quantity)::integer,
+            ALTER COLUMN price TYPE numeric(12, 2) USING round(price::numeric, 2)
+        """
+    )
+    op.execute('ANALYZE "check", productcheck')
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE productcheck
+            ALTER COLUMN quantity TYPE double precision,
+            ALTER COLUMN price TYPE double precision
+        """
+    )
+    # the host of the stored urls is unknown here, so they are restored relative to it
+    op.execute(
+        """
+        ALTER TABLE "check"
+            ALTER COLUMN token TYPE varchar(50) USING replace(token::text, '-', ''),
+            ALTER COLUMN amount TYPE double precision,
+            ALTER COLUMN total TYPE double precision,
+            ALTER COLUMN rest TYPE double precision,
+            ADD COLUMN url varchar(256)
+        """
+    )
+    op.execute("""UPDATE "check" SET url = '/api/checks/' || token || '/show-public'""")
+    op.alter_column('check', 'url', nullable=False)
@@ -0,0 +1,185 @@
+"""partition checks by month
+
+Revision ID: f2a6c9e3d1b8
+Revises: e5b1c8d4a2f6
+Create Date: 2026-10-18 18:05:33.902514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from db.partitioning import add_months, create_default_partition_sql, create_partition_sql, month_start
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6c9e3d1b8'
+down_revision: Union[str, None] = 'e5b1c8d4a2f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# partitions created ahead of the current month, later ones are created by scripts/manage_partitions.py
+MONTHS_AHEAD = 3
+
+UNPARTITIONED_INDEXES = [
+    'check_pkey', 'check_token_key', 'ix_check_customer_id_created_at',
+    'productcheck_pkey', 'ix_productcheck_check_id', 'ix_productcheck_name_trgm',
+]
+PARTITIONED_INDEXES = [
+    'check_pkey', 'check_token_created_at_key', 'ix_check_customer_id_created_at',
+    'productcheck_pkey', 'ix_productcheck_check_id', 'ix_productcheck_name_trgm',
+]
+
+
+def rename_tables(suffix: str, indexes: Sequence[str]) -> None:
+    # index names are unique in the schema, the indexes of the replaced tables make way for the new ones
+    op.rename_table('productcheck', f'productcheck_{suffix}')
+    op.rename_table('check', f'check_{suffix}')
+    for index in indexes:
+        op.execute(f'ALTER INDEX IF EXISTS {index} RENAME TO {index}_{suffix}')
+
+
+def create_indexes() -> None:
+    op.create_index('ix_check_customer_id_created_at', 'check', ['customer_id', 'created_at', 'check_id'])
+    op.create_index('ix_productcheck_check_id', 'productcheck', ['check_id'])
+    op.create_index(
+        'ix_productcheck_name_trgm', 'productcheck', ['name'],
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+
+
+def move_sequences() -> None:
+    # the sequences keep counting, they are owned by the new tables before the old ones are dropped
+    op.execute('ALTER SEQUENCE check_check_id_seq OWNED BY "check".check_id')
+    op.execute('ALTER SEQUENCE productcheck_check_detail_id_seq OWNED BY productcheck.check_detail_id')
+
+
+def upgrade() -> None:
+    # a table can not become partitioned, so both tables are rebuilt: the old ones are renamed,
+    # the partitioned ones are created and filled, then the old ones are dropped
+    rename_tables('unpartitioned', UNPARTITIONED_INDEXES)
+
+    op.create_table(
+        'check',
+        sa.Column(
+            'check_id', sa.Integer(), server_default=sa.text("nextval('check_check_id_seq'::regclass)"), nullable=False
+        ),
+        sa.Column('token', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('type', postgresql.ENUM('CASH', 'CASHLESS', name='payment_type', create_type=False), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('rest', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['user.user_id'], ),
+        sa.PrimaryKeyConstraint('check_id', 'created_at'),
+        sa.UniqueConstraint('token', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_table(
+        'productcheck',
+        sa.Column(
+            'check_detail_id', sa.Integer(),
+            server_default=sa.text("nextval('productcheck_check_detail_id_seq'::regclass)"), nullable=False,
+        ),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('check_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('price', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('check_detail_id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+
+    connection = op.get_bind()
+    oldest = connection.execute(sa.text('SELECT min(created_at) FROM check_unpartitioned')).scalar()
+    current_month = month_start(connection.execute(sa.text('SELECT LOCALTIMESTAMP')).scalar())
+    month = month_start(oldest) if oldest is not None else current_month
+    while month <= add_months(current_month, MONTHS_AHEAD):
+        op.execute(create_partition_sql('check', month))
+        op.execute(create_partition_sql('productcheck', month))
+        month = add_months(month, 1)
+    op.execute(create_default_partition_sql('check'))
+    op.execute(create_default_partition_sql('productcheck'))
+
+    op.execute(
+        """
+        INSERT INTO "check" (check_id, token, type, amount, total, rest, created_at, customer_id)
+        SELECT check_id, token, type, amount, total, rest, created_at, customer_id FROM check_unpartitioned
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO productcheck (check_detail_id, name, check_id, quantity, price, created_at)
+        SELECT p.check_detail_id, p.name, p.check_id, p.quantity, p.price, c.created_at
+        FROM productcheck_unpartitioned AS p JOIN check_unpartitioned AS c ON c.check_id = p.check_id
+        """
+    )
+    move_sequences()
+    op.drop_table('productcheck_unpartitioned')
+    op.drop_table('check_unpartitioned')
+
+    # indexes and the foreign key are built once the rows are copied
+    create_indexes()
+    op.create_foreign_key(
+        'productcheck_check_id_created_at_fkey', 'productcheck', 'check',
+        ['check_id', 'created_at'], ['check_id', 'created_at'], onupdate='CASCADE',
+    )
+    op.execute('ANALYZE "check", productcheck')
+
+
+def downgrade() -> None:
+    # partitions detached by scripts/manage_partitions.py are left as they are
+    rename_tables('partitioned', PARTITIONED_INDEXES)
+
+    op.create_table(
+        'check',
+        sa.Column(
+            'check_id', sa.Integer(), server_default=sa.text("nextval('check_check_id_seq'::regclass)"), nullable=False
+        ),
+        sa.Column('token', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('type', postgresql.ENUM('CASH', 'CASHLESS', name='payment_type', create_type=False), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('rest', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['user.user_id'], ),
+        sa.PrimaryKeyConstraint('check_id'),
+        sa.UniqueConstraint('token'),
+    )
+    op.create_table(
+        'productcheck',
+        sa.Column(
+            'check_detail_id', sa.Integer(),
+            server_default=sa.text("nextval('productcheck_check_detail_id_seq'::regclass)"), nullable=False,
+        ),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('check_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('price', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('check_detail_id'),
+    )
+
+    op.execute(
+        """
+        INSERT INTO "check" (check_id, token, type, amount, created_at, customer_id, total, rest)
+        SELECT check_id, token, type, amount, created_at, customer_id, total, rest FROM check_partitioned
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO productcheck (check_detail_id, name, check_id, quantity, price)
+        SELECT check_detail_id, name, check_id, quantity, price FROM productcheck_partitioned
+        """
+    )
+    move_sequences()
+    # dropping a partitioned table drops its partitions
+    op.drop_table('productcheck_partitioned')
+    op.drop_table('check_partitioned')
+
+    create_indexes()
+    op.create_foreign_key('productcheck_check_id_fkey', 'productcheck', 'check', ['check_id'], ['check_id'])
+    op.execute('ANALYZE "check", productcheck')
@@ -1,12 +1,14 @@
-from typing import List
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from starlette import status
 
+from api.responses import PydanticJSONResponse
+from core.config import settings
 from security.auth_connector import AuthConnector
 from db_cruds.user import DBUserOps
-from deps import get_auth_connector, get_user_crud
-from models.all_models import User
+from deps import get_auth_connector, get_read_user_crud
+from schemas.pagination import CursorPage
 from schemas.token import TokenBase, TokenQuery
 from schemas.user import UserBase, UserRegisterQuery, UserLoginQuery
 
@@ -65,13 +67,28 @@ async def refresh_token(
 @router.get(
     "/list/",
     summary="Get users",
-    description="Get users",
-    response_model=List[UserBase],
+    description="Get a page of users ordered by id",
+    response_model=CursorPage[UserBase],
 )
 async def get_users(
-    user_crud: DBUserOps = Depends(get_user_crud),
-) -> List[User]:
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    email: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Opaque cursor of the page from the previous response"),
+    size: int = Query(settings.USERS_PAGE_DEFAULT_SIZE, ge=1, le=settings.USERS_PAGE_MAX_SIZE),
+    user_crud: DBUserOps = Depends(get_read_user_crud),
+) -> Any:
     """
-    Getting the list of all registered users
+    Getting the page of registered users matching the filters
     """
-    return await user_crud.get_list()
+    filters = {
+        field: value
+        for field, value in dict(first_name=first_name, last_name=last_name, email=email).items()
+        if value is not None
+    }
+    users, next_cursor = await user_crud.get_page(size=size, cursor=cursor, filters=filters)
+    return PydanticJSONResponse(CursorPage[UserBase](
+        items=[UserBase.model_validate(user) for user in users],
+        size=size,
+        next_cursor=next_cursor,
+    ))
@@ -1,24 +1,41 @@
-from datetime import date
-from typing import Any, Union, Optional
+import csv
+import hashlib
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from typing import (
+    Annotated, Any, AsyncContextManager, AsyncIterator, Callable, Dict, List, NamedTuple, Tuple, Optional
+)
+from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from fastapi_pagination import Page, paginate
-from pydantic import ValidationError
+from annotated_types import Len
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from starlette import status
 from fastapi.requests import Request
-from starlette.responses import HTMLResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import HTMLResponse, Response, StreamingResponse
 from starlette.templating import Jinja2Templates
 
+from api.responses import PydanticJSONResponse
 from api.user_auth_bearer.deps import token_access
-from core.enums import PaymentType
-from core.validation_messages import NOT_ENOUGH_MONEY
+from core.cache import public_check_cache
+from core.config import settings
+from core.enums import ExportFormat, PaymentType
+from core.validation_messages import IDEMPOTENCY_KEY_REUSED, NOT_ENOUGH_MONEY
 from db_cruds.check import DBCheckOps
-from deps import get_check_crud
-from models.all_models import User, ProductCheck, Check
-from schemas.check import CheckOrderInput, CheckOut, Payment
+from db_cruds.group_commit import CheckGroupCommitter
+from db_cruds.idempotency import DBIdempotencyKeyOps
+from deps import (
+    get_check_crud, get_check_group_committer, get_idempotency_key_crud, get_read_check_crud,
+    get_read_session_factory,
+)
+from models.all_models import IdempotencyKey, ProductCheck, Check
+from schemas.check import CheckBatchItemOut, CheckBatchOut, CheckOrderInput, CheckOut, Payment
+from schemas.pagination import CursorPage
 from schemas.product import Product
+from schemas.user import UserPrincipal
 
-from utils import random_token
+from utils import random_token, to_naive_utc
 
 router = APIRouter(prefix="/checks", tags=["Checks"])
 
@@ -33,48 +50,217 @@ router = APIRouter(prefix="/checks", tags=["Checks"])
 async def create_check(
         request: Request,
         check_order: CheckOrderInput,
-        current_user: User = Depends(token_access()),
-        check_ops: DBCheckOps = Depends(get_check_crud)
-
+        idempotency_key: Optional[str] = Header(
+            None,
+            min_length=1,
+            max_length=255,
+            description="Retries with the same key get the response of the first try",
+        ),
+        current_user: UserPrincipal = Depends(token_access(write=True)),
+        check_ops: DBCheckOps = Depends(get_check_crud),
+        idempotency_ops: DBIdempotencyKeyOps = Depends(get_idempotency_key_crud),
+        check_group_committer: Optional[CheckGroupCommitter] = Depends(get_check_group_committer),
 ) -> Any:
     """
-    Create a check using the given payload.
+    Create a check using the given payload. A retry sent with the Idempotency-Key of a completed
+    request gets the stored response, marked by the Idempotent-Replayed header, and creates nothing.
+    With group commit enabled, checks of concurrent requests are committed together. Requests with
+    the Idempotency-Key header bypass it, their key is claimed in the transaction inserting the check.
     """
-    prepared_data = await check_ops.convert_schema_to_dict(check_order)
-
-    products_in_check = prepared_data.pop("products")
-    total_products_cost = 0
+    if idempotency_key is not None:
+        fingerprint = hashlib.sha256(check_order.model_dump_json().encode()).digest()
+        completed_request = await idempotency_ops.claim(current_user.user_id, idempotency_key, fingerprint)
+        if completed_request is not None:
+            return _replay_response(completed_request, fingerprint)
 
-    products_instances = []
-    for product in products_in_check:
-        products_instances.append(ProductCheck(**product))
-        total_products_cost += product["price"]*product["quantity"]
+    try:
+        check_values, products = _prepare_check_values(check_order, current_user.user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
 
-    if prepared_data["payment"]["amount"] < total_products_cost:
-        raise ValidationError(NOT_ENOUGH_MONEY)
+    public_url = _public_check_url_builder(request)
+    customer_name = f"{current_user.first_name} {current_user.last_name}"
 
-    check_unique_token = random_token()
-    prepared_data["payment"]["token"] = check_unique_token
-    prepared_data["payment"]["customer_id"] = current_user.user_id
-    prepared_data["payment"]["url"] = str(request.url_for("public_check", token=check_unique_token))
+    if check_group_committer is not None and idempotency_key is None:
+        check_id, created_at = await check_group_committer.create(check_values, products)
+        check_out = _check_out_from_values(check_values, products, check_id, created_at, public_url, customer_name)
+        return PydanticJSONResponse(check_out, status_code=status.HTTP_201_CREATED)
 
-    check = Check(**prepared_data["payment"])
-    check.details.extend(products_instances)
+    check = Check(**check_values)
+    check.details.extend(ProductCheck(**product) for product in products)
     check = await check_ops.create_check(check)
 
     payment_info = Payment.model_validate(check)
     product_info = [Product.model_validate(e) for e in check.details]
 
-    return CheckOut(
+    check_out = CheckOut(
         payment=payment_info,
         products=product_info,
         check_id=check.check_id,
         created_at=check.created_at,
         token=check.token,
-        url=check.url,
+        url=public_url(check.token),
+        total=check.total,
+        rest=check.rest,
+        customer_name=customer_name,
+    )
+    response = PydanticJSONResponse(check_out, status_code=status.HTTP_201_CREATED)
+    if idempotency_key is not None:
+        await idempotency_ops.save_response(current_user.user_id, idempotency_key, response.status_code, response.body)
+    return response
+
+
+def _replay_response(completed_request: IdempotencyKey, fingerprint: bytes) -> Response:
+    """
+    Build the stored response of the completed request sent with the same idempotency key
+
+    :raises: HTTPException when the key was used with another payload.
+    """
+    if completed_request.fingerprint != fingerprint:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=IDEMPOTENCY_KEY_REUSED)
+    return Response(
+        content=completed_request.response_body,
+        status_code=completed_request.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+@router.post(
+    "/batch",
+    summary="Create checks in bulk",
+    description="Create many checks in one transaction, every check gets its own result or error",
+    response_model=CheckBatchOut,
+)
+async def create_checks_batch(
+        request: Request,
+        check_orders: Annotated[List[CheckOrderInput], Len(min_length=1, max_length=settings.CHECK_BATCH_MAX_SIZE)],
+        current_user: UserPrincipal = Depends(token_access(write=True)),
+        check_ops: DBCheckOps = Depends(get_check_crud)
+) -> Any:
+    """
+    Create checks buffered by a terminal. Orders which can not be paid are reported
+    as errors of their items, all the others are inserted together.
+    """
+    public_url = _public_check_url_builder(request)
+    customer_name = f"{current_user.first_name} {current_user.last_name}"
+
+    results = []
+    accepted = []
+    for index, check_order in enumerate(check_orders):
+        try:
+            check_values, products = _prepare_check_values(check_order, current_user.user_id)
+        except ValueError as e:
+            results.append(CheckBatchItemOut(index=index, error=str(e)))
+        else:
+            accepted.append((index, check_values, products))
+
+    if accepted:
+        created_checks = await check_ops.create_checks_bulk(
+            [check_values for _, check_values, _ in accepted], [products for _, _, products in accepted]
+        )
+        for (index, check_values, products), (check_id, created_at) in zip(accepted, created_checks):
+            check_out = _check_out_from_values(check_values, products, check_id, created_at, public_url, customer_name)
+            results.append(CheckBatchItemOut(index=index, check=check_out))
+
+    results.sort(key=lambda item: item.index)
+    return PydanticJSONResponse(CheckBatchOut(items=results))
+
+
+def _public_check_url_builder(request: Request) -> Callable[[UUID], str]:
+    """
+    Resolve the public check route once and return a function which builds its url for a check token
+    """
+    placeholder = "__token__"
+    url = str(request.url_for("public_check", token=placeholder))
+    return lambda token: url.replace(placeholder, token.hex)
+
+
+async def _with_public_urls(
+        checks: AsyncIterator[CheckOut], public_url: Callable[[UUID], str]
+) -> AsyncIterator[CheckOut]:
+    async for check in checks:
+        check.url = public_url(check.token)
+        yield check
+
+
+def _prepare_check_values(
+        check_order: CheckOrderInput,
+        customer_id: int,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Build column values of a new check and its products from the order.
+
+    :param check_order: The order of the check
+    :param customer_id: The unique identifier of a user who creates the check
+    :raises: ValueError when the payment does not cover the products cost.
+
+    :returns: The check values and the list of its products values.
+    """
+    products = [product.model_dump() for product in check_order.products]
+    total_products_cost = sum(product["price"] * product["quantity"] for product in products)
+
+    check_values = check_order.payment.model_dump()
+    if check_values["amount"] < total_products_cost:
+        raise ValueError(NOT_ENOUGH_MONEY)
+
+    check_values.update(
+        token=random_token(),
+        customer_id=customer_id,
         total=total_products_cost,
-        rest=prepared_data["payment"]["amount"]-total_products_cost,
-        customer_name=f"{current_user.first_name} {current_user.last_name}"
+        rest=check_values["amount"] - total_products_cost,
+    )
+    return check_values, products
+
+
+def _check_out_from_values(
+        check_values: Dict[str, Any],
+        products: List[Dict[str, Any]],
+        check_id: int,
+        created_at: datetime,
+        public_url: Callable[[UUID], str],
+        customer_name: str,
+) -> CheckOut:
+    """
+    Build the response of a check inserted from the values prepared by _prepare_check_values
+    """
+    return CheckOut(
+        payment=Payment(type=check_values["type"], amount=check_values["amount"]),
+        products=[Product(**product) for product in products],
+        check_id=check_id,
+        created_at=created_at,
+        token=check_values["token"],
+        url=public_url(check_values["token"]),
+        total=check_values["total"],
+        rest=check_values["rest"],
+        customer_name=customer_name,
+    )
+
+
+def _check_list_filters(
+        date_from: Optional[datetime] = Query(
+            None, alias="from", description="Checks created at or after, naive values are taken as UTC"
+        ),
+        date_to: Optional[datetime] = Query(
+            None, alias="to", description="Checks created before, naive values are taken as UTC"
+        ),
+        greater_than_date: Optional[date] = Query(
+            None, deprecated=True, description="Checks created after the day, use from instead"
+        ),
+        total_sum: Optional[Decimal] = None,
+        payment_type: Optional[PaymentType] = None,
+) -> Dict[str, Any]:
+    """
+    Filters shared by the check listings
+    """
+    if date_from and date_to and to_naive_utc(date_from) >= to_naive_utc(date_to):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="from must be earlier than to")
+    return dict(
+        date_from=date_from,
+        date_to=date_to,
+        greater_than_date=greater_than_date,
+        total_sum=total_sum,
+        payment_type=payment_type,
     )
 
 
@@ -82,22 +268,97 @@ async def create_check(
     "/my-checks",
     summary="List of all checks created by a user",
     description="Get checks created by a user",
-    response_model=Page[CheckOut]
+    response_model=CursorPage[CheckOut]
 )
 async def get_customer_checks(
-        greater_than_date: Union[date, None] = None,
-        total_sum: Optional[float] = None,
-        payment_type: Optional[PaymentType] = None,
-        current_user: User = Depends(token_access()),
-        check_ops: DBCheckOps = Depends(get_check_crud),
+        request: Request,
+        filters: Dict[str, Any] = Depends(_check_list_filters),
+        search: Optional[str] = Query(
+            None, min_length=3, max_length=100, description="Text in product names, the best matching checks first"
+        ),
+        cursor: Optional[str] = Query(None, description="Opaque cursor of the page from the previous response"),
+        page: Optional[int] = Query(None, ge=1, description="Page number, switches to LIMIT/OFFSET pagination"),
+        size: int = Query(settings.CHECKS_PAGE_DEFAULT_SIZE, ge=1, le=settings.CHECKS_PAGE_MAX_SIZE),
+        current_user: UserPrincipal = Depends(token_access()),
+        check_ops: DBCheckOps = Depends(get_read_check_crud),
 ) -> Any:
     """
-    Getting the list of all checks created by curren user
+    Getting the page of checks created by curren user, the newest first
     """
 
-    query_params = dict(greater_than_date=greater_than_date, total_sum=total_sum, payment_type=payment_type)
-    result = await check_ops.get_user_checks_with_details(customer_id=current_user.user_id, filters=query_params)
-    return paginate(result)
+    checks_page = await check_ops.get_user_checks_with_details(
+        customer_id=current_user.user_id, filters=filters, size=size, cursor=cursor, page=page, search=search
+    )
+    public_url = _public_check_url_builder(request)
+    for check in checks_page.items:
+        check.url = public_url(check.token)
+    return PydanticJSONResponse(checks_page)
+
+
+CHECK_EXPORT_CSV_HEADER = [
+    "check_id", "created_at", "token", "payment_type", "amount", "total", "rest", "product", "price", "quantity"
+]
+
+
+@router.get(
+    "/export",
+    summary="Export all checks created by a user",
+    description="Stream all checks created by a user as NDJSON or CSV, the oldest first",
+    response_class=StreamingResponse,
+)
+async def export_customer_checks(
+        request: Request,
+        export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+        filters: Dict[str, Any] = Depends(_check_list_filters),
+        current_user: UserPrincipal = Depends(token_access()),
+        session_factory: Callable[[], AsyncContextManager[AsyncSession]] = Depends(get_read_session_factory),
+) -> Any:
+    """
+    Streaming the whole history of checks created by current user. Rows are sent as they come
+    from the database cursor, when the client disconnects the stream and its cursor are cancelled.
+    """
+    serialize = _serialize_checks_csv if export_format == ExportFormat.CSV else _serialize_checks_ndjson
+    public_url = _public_check_url_builder(request)
+
+    async def stream_checks() -> AsyncIterator[str]:
+        # the request dependencies are closed before the body is sent, so the stream owns its session
+        async with session_factory() as session:
+            checks = DBCheckOps(session).stream_user_checks(
+                customer_id=current_user.user_id, filters=filters, batch_size=settings.CHECK_EXPORT_BATCH_SIZE
+            )
+            async for chunk in serialize(_with_public_urls(checks, public_url)):
+                yield chunk
+
+    media_type = "text/csv" if export_format == ExportFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        stream_checks(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="checks.{export_format.value}"'},
+    )
+
+
+async def _serialize_checks_ndjson(checks: AsyncIterator[CheckOut]) -> AsyncIterator[str]:
+    async for check in checks:
+        yield check.model_dump_json() + "\n"
+
+
+async def _serialize_checks_csv(checks: AsyncIterator[CheckOut]) -> AsyncIterator[str]:
+    """
+    One row per product of a check, the check columns are repeated on every row
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CHECK_EXPORT_CSV_HEADER)
+
+    async for check in checks:
+        for product in check.products:
+            writer.writerow([
+                check.check_id, check.created_at.isoformat(), check.token.hex, check.payment.type.value,
+                check.payment.amount, check.total, check.rest, product.name, product.price, product.quantity,
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
 
 
 @router.get(
@@ -107,18 +368,39 @@ async def get_customer_checks(
     response_model=CheckOut,
 )
 async def get_check_by_id(
+        request: Request,
         check_id: int,
-        current_user: User = Depends(token_access()),
-        check_ops: DBCheckOps = Depends(get_check_crud),
+        current_user: UserPrincipal = Depends(token_access()),
+        check_ops: DBCheckOps = Depends(get_read_check_crud),
 ) -> Any:
     """
     Getting the check with specified check id by registered user
     """
-    return await check_ops.get_with_collected_details(customer_id=current_user.user_id, check_id=check_id)
+    check = await check_ops.get_with_collected_details(customer_id=current_user.user_id, check_id=check_id)
+    check.url = _public_check_url_builder(request)(check.token)
+    return PydanticJSONResponse(check)
 
 
 templates = Jinja2Templates(directory="static/templates")
 
+# a check never changes after creation, so its page may be cached by clients forever
+PUBLIC_CHECK_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class RenderedInvoice(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check whether the If-None-Match request header matches the etag
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
 
 @router.get(
     "/{token}/show-public",
@@ -130,20 +412,34 @@ templates = Jinja2Templates(directory="static/templates")
 async def get_check_by_token(
         request: Request,
         token: str,
-        check_ops: DBCheckOps = Depends(get_check_crud),
+        check_ops: DBCheckOps = Depends(get_read_check_crud),
 ) -> Any:
     """
     Sending html page with all check details. Can be accessed any unauthorized user
     """
 
-    check = await check_ops.get_with_collected_details(check_token=token)
-    check_data = check.model_dump()
+    try:
+        check_token = UUID(token)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"The object with primary key {token} could not be found.")
 
-    for key in ["check_id", "token", "url"]:
-        check_data.pop(key)
+    invoice = public_check_cache.get(check_token)
+    if invoice is None:
+        check = await check_ops.get_with_collected_details(check_token=check_token)
+        check_data = check.model_dump()
 
-    return templates.TemplateResponse(
-        request=request,
-        name="invoice.html",
-        context={"check_data": check_data, "payment_map": {PaymentType.CASH: "Готівка", PaymentType.CASHLESS: "Карта"}}
-    )
+        for key in ["check_id", "token", "url"]:
+            check_data.pop(key)
+
+        body = templates.get_template("invoice.html").render(
+            check_data=check_data,
+            payment_map={PaymentType.CASH: "Готівка", PaymentType.CASHLESS: "Карта"},
+        ).encode()
+        invoice = RenderedInvoice(body=body, etag=f'"{hashlib.sha256(body).hexdigest()}"')
+        public_check_cache.set(check_token, invoice)
+
+    headers = {"ETag": invoice.etag, "Cache-Control": PUBLIC_CHECK_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), invoice.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return HTMLResponse(invoice.body, headers=headers)
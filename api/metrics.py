@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from starlette.responses import PlainTextResponse
+
+from core.metrics import registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Endpoint exposes the application metrics in the Prometheus text format
+    :return: PlainTextResponse
+    """
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
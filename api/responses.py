@@ -0,0 +1,17 @@
+from typing import Any
+
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+
+class PydanticJSONResponse(JSONResponse):
+    """
+    JSON response serialized by pydantic-core straight to bytes.
+
+    Endpoints returning it skip the response_model validation and the jsonable_encoder pass of FastAPI,
+    so the content must already be the response model instance. Keep response_model on the route for
+    the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
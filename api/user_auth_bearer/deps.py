@@ -1,15 +1,17 @@
-from api.user_auth_bearer.jwt_bearer import JWTBearer
+from api.user_auth_bearer.jwt_bearer import JWTBearer, WriteJWTBearer
 from deps import get_token_handler
 from schemas.token import TokenType
 
 
-def token_access() -> JWTBearer:
+def token_access(write: bool = False) -> JWTBearer:
     """
     This method allow everyone user access with any access role
     for target action function to handle input request.
+    :param write: whether the endpoint writes, its principal is then read in the transaction of the request
     :returns: The instance of JWTBearer class to handle access permission.
     """
-    return JWTBearer(
+    bearer_class = WriteJWTBearer if write else JWTBearer
+    return bearer_class(
         auth_handler=get_token_handler(),
         required_token_type=TokenType.AUTH_ACCESS,
     )
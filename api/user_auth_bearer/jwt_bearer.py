@@ -7,10 +7,12 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from starlette import status
 
 from security.token_handler import TokenHandler
+from core.cache import principal_cache
 from core.config import settings
 from db_cruds.user import DBUserOps
-from deps import get_user_crud
+from deps import get_read_user_crud, get_user_crud
 from schemas.token import TokenType
+from schemas.user import UserPrincipal
 from utils import get_expire_date, utcnow
 
 
@@ -56,11 +58,32 @@ class JWTBearer(BaseJWTBearer):
     ):
         super(JWTBearer, self).__init__(auth_handler, required_token_type=required_token_type)
 
-    async def __call__(self, request: Request, user_crud: DBUserOps = Depends(get_user_crud)):
+    async def __call__(self, request: Request, user_crud: DBUserOps = Depends(get_read_user_crud)) -> UserPrincipal:
+        return await self._get_principal(request, user_crud)
 
+    async def _get_principal(self, request: Request, user_crud: DBUserOps) -> UserPrincipal:
         credentials: Optional[HTTPAuthorizationCredentials] = await super().__call__(request)
         token_type, user_id = self._parse_payload(credentials.credentials)
         self._check_token_type(token_type)
 
-        user = await user_crud.get(user_id)
-        return user
+        # the session of user_crud does not connect to the database until the first query,
+        # so a cached principal costs no database round trip at all
+        principal = principal_cache.get(user_id)
+        if principal is None:
+            user = await user_crud.get(user_id)
+            if user is None:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+            principal = UserPrincipal.model_validate(user)
+            principal_cache.set(user_id, principal)
+
+        return principal
+
+
+class WriteJWTBearer(JWTBearer):
+    """
+    JWT Bearer authorization of endpoints which write, the principal is read on the session of the request,
+    so a request does not hold a connection of a read session next to the one of its transaction
+    """
+
+    async def __call__(self, request: Request, user_crud: DBUserOps = Depends(get_user_crud)) -> UserPrincipal:
+        return await self._get_principal(request, user_crud)
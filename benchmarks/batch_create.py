@@ -0,0 +1,53 @@
+"""
+Compare creating checks of a running application one by one through POST /checks/
+with a single POST /checks/batch.
+
+Usage:
+    python -m benchmarks.batch_create --base-url http://localhost:8082 --checks 500
+"""
+import argparse
+import asyncio
+import time
+
+from httpx import AsyncClient
+
+from benchmarks.common import register_and_login
+from core.config import settings
+
+
+def build_order(products_per_check: int) -> dict:
+    return {
+        "products": [{"name": f"product {i}", "price": 10, "quantity": 1} for i in range(products_per_check)],
+        "payment": {"type": "cash", "amount": 10 * products_per_check},
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Time single and bulk creation of the same number of checks
+    """
+    order = build_order(args.products_per_check)
+    async with AsyncClient(base_url=args.base_url, timeout=300) as client:
+        headers = {"Authorization": (await register_and_login(client))["authorization"]}
+
+        started = time.perf_counter()
+        for _ in range(args.checks):
+            response = await client.post(f"{settings.API_PREFIX}/checks/", json=order, headers=headers)
+            response.raise_for_status()
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = await client.post(f"{settings.API_PREFIX}/checks/batch", json=[order] * args.checks, headers=headers)
+        response.raise_for_status()
+        batch = time.perf_counter() - started
+
+    print(f"{args.checks} x POST /checks/:   {single:.2f}s, {args.checks / single:.0f} checks/s")
+    print(f"1 x POST /checks/batch:    {batch:.2f}s, {args.checks / batch:.0f} checks/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8082")
+    parser.add_argument("--checks", type=int, default=500)
+    parser.add_argument("--products-per-check", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
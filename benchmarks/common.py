@@ -0,0 +1,76 @@
+import logging
+import math
+import uuid
+from typing import Dict, List
+
+from httpx import AsyncClient
+
+from core.config import settings
+
+
+# a log line per request would drown the results
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Get the nearest rank percentile of values
+
+    :param values: measured values
+    :param percent: percentile between 0 and 100
+    :return: the percentile value
+    """
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float]) -> str:
+    """
+    Format latency percentiles measured in seconds
+    """
+    return (
+        f"n={len(latencies)} "
+        f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p95={percentile(latencies, 95) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms"
+    )
+
+
+async def register_and_login(client: AsyncClient, password: str = "benchmark-password") -> Dict[str, str]:
+    """
+    Register a new user through the API and log it in
+
+    :param client: client of the running application
+    :param password: password of the user
+    :return: the user credentials and authorization headers
+    """
+    email = f"benchmark-{uuid.uuid4().hex[:12]}@example.com"
+    response = await client.post(
+        f"{settings.API_PREFIX}/auth/register/",
+        json={"first_name": "Bench", "last_name": "Mark", "email": email, "password": password},
+    )
+    response.raise_for_status()
+
+    response = await client.post(f"{settings.API_PREFIX}/auth/login/", json={"user_email": email, "password": password})
+    response.raise_for_status()
+    return {
+        "user_email": email,
+        "password": password,
+        "authorization": f"Bearer {response.json()['access_token']}",
+    }
+
+
+async def create_checks(client: AsyncClient, authorization: str, count: int, products_per_check: int = 3) -> None:
+    """
+    Create checks through the API
+    """
+    payload = {
+        "products": [{"name": f"product {i}", "price": 10, "quantity": 1} for i in range(products_per_check)],
+        "payment": {"type": "cash", "amount": 10 * products_per_check},
+    }
+    for _ in range(count):
+        response = await client.post(f"{settings.API_PREFIX}/checks/", json=payload, headers={"Authorization": authorization})
+        response.raise_for_status()
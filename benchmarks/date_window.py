@@ -0,0 +1,95 @@
+"""
+Seed the local database and time check listings filtered by from/to date windows of growing width.
+Prints the median wall time of DBCheckOps.get_user_checks_with_details, the execution time
+reported by EXPLAIN ANALYZE and whether the plan uses the (customer_id, created_at) index.
+
+Usage:
+    python -m benchmarks.date_window --users 10 --checks-per-user 50000 --products-per-check 3
+"""
+import argparse
+import asyncio
+import logging
+import re
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from benchmarks.explain_queries import Explain
+from benchmarks.seed import seed_checks
+from core.enums import CheckLoadProfile
+from core.session import async_session
+from db_cruds.check import DBCheckOps
+from db_cruds.queries import BASE_CHECK_GET_LIST_QUERY, CHECK_LOAD_OPTIONS
+from models.all_models import Check
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+WINDOWS_IN_DAYS = [1, 7, 30, 90, 365]
+
+
+def window_filters(newest: datetime, days: int) -> Dict[str, Optional[datetime]]:
+    # an aware upper bound, the way API clients send it
+    date_to = newest.replace(tzinfo=timezone.utc)
+    return dict(date_from=date_to - timedelta(days=days), date_to=date_to, total_sum=None, payment_type=None)
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Seed data and time listings of date windows
+    """
+    async with async_session() as db:
+        if args.customer_id:
+            customer_id = args.customer_id
+        else:
+            customer_id = (await seed_checks(db, args.users, args.checks_per_user, args.products_per_check))[0]
+
+        newest = (await db.execute(select(func.max(Check.created_at)).where(Check.customer_id == customer_id))).scalar()
+        check_ops = DBCheckOps(db)
+
+        rows: List[str] = []
+        for days in WINDOWS_IN_DAYS:
+            filters = window_filters(newest, days)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                page = await check_ops.get_user_checks_with_details(customer_id, filters, size=PAGE_SIZE)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            query = (
+                DBCheckOps._filter_checks_query(
+                    BASE_CHECK_GET_LIST_QUERY.options(*CHECK_LOAD_OPTIONS[CheckLoadProfile.DETAILED])
+                    .where(Check.customer_id == customer_id),
+                    filters,
+                )
+                .order_by(Check.created_at.desc(), Check.check_id.desc())
+                .limit(PAGE_SIZE + 1)
+            )
+            plan = [row[0] for row in await db.execute(Explain(query))]
+            if args.verbose:
+                logger.info(f"{days} days\n" + "\n".join(plan))
+            execution = re.search(r"Execution Time: ([\d.]+) ms", plan[-1])
+            # indexes of partitions are named after the partition and the columns
+            uses_index = any("customer_id_created_at" in line for line in plan)
+            rows.append(
+                f"{days:>4} days  items={len(page.items):<3} median={statistics.median(timings):7.2f} ms  "
+                f"explain={float(execution.group(1)) if execution else float('nan'):7.2f} ms  index={uses_index}"
+            )
+
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--checks-per-user", type=int, default=50000)
+    parser.add_argument("--products-per-check", type=int, default=3)
+    parser.add_argument("--customer-id", type=int, help="time an already seeded customer instead of seeding")
+    parser.add_argument("--repeat", type=int, default=20, help="calls of every window")
+    parser.add_argument("--verbose", action="store_true", help="print the query plans")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,36 @@
+"""
+Compare the cost of TokenHandler.decode_token for a reused access token
+with a full jwt verification on every call.
+
+Usage:
+    python -m benchmarks.decode_token --calls 100000
+"""
+import argparse
+import timeit
+
+from core.cache import token_payload_cache
+from schemas.token import TokenType
+from security.token_handler import TokenHandler
+
+
+def main(args: argparse.Namespace) -> None:
+    """
+    Time uncached and cached token decoding
+    """
+    handler = TokenHandler()
+    token, _ = handler.encode_token(TokenType.AUTH_ACCESS, 1)
+
+    uncached = timeit.timeit(lambda: handler.extract_payload_from_token(token), number=args.calls)
+
+    token_payload_cache.clear()
+    cached = timeit.timeit(lambda: handler.decode_token(token, token_type=TokenType.AUTH_ACCESS), number=args.calls)
+
+    print(f"jwt.decode on every call: {uncached / args.calls * 1e6:.2f} us/call")
+    print(f"decode_token with cache:  {cached / args.calls * 1e6:.2f} us/call")
+    print(f"saving per request:       {(uncached - cached) / args.calls * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000)
+    main(parser.parse_args())
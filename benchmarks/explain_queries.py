@@ -0,0 +1,150 @@
+"""
+Seed the local database and print EXPLAIN ANALYZE timings of the check read queries
+without and with the indexes declared on the models.
+
+Usage:
+    python -m benchmarks.explain_queries --users 10 --checks-per-user 20000 --products-per-check 3
+"""
+import argparse
+import asyncio
+import logging
+import re
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Executable, ClauseElement, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from benchmarks.seed import seed_checks
+from core.enums import PaymentType
+from core.session import async_session
+from db_cruds.queries import BASE_CHECK_GET_QUERY, BASE_CHECK_GET_LIST_QUERY, where_check_token
+from models.all_models import Check, ProductCheck
+from utils import utcnow
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN ANALYZE of the wrapped statement"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (ANALYZE, BUFFERS) " + compiler.process(element.statement, **kw)
+
+
+async def build_statements(db: AsyncSession, customer_id: int) -> Dict[str, Executable]:
+    """
+    Build the statements issued by DBCheckOps for one customer.
+
+    :param db: database session
+    :param customer_id: the customer whose checks are queried
+    :return: statements by their description
+    """
+    check_id, token = (
+        await db.execute(select(Check.check_id, Check.token).where(Check.customer_id == customer_id).limit(1))
+    ).one()
+    newest_first = (Check.created_at.desc(), Check.check_id.desc())
+    page = BASE_CHECK_GET_LIST_QUERY.where(Check.customer_id == customer_id).order_by(*newest_first)
+    page_ids = list((await db.execute(select(Check.check_id).where(Check.customer_id == customer_id).limit(PAGE_SIZE))).scalars())
+
+    return {
+        "list: first page": page.limit(PAGE_SIZE + 1),
+        "list: payment type and date": (
+            page.where(Check.type == PaymentType.CASH)
+            .where(Check.created_at >= utcnow().replace(tzinfo=None) - timedelta(days=30))
+            .limit(PAGE_SIZE + 1)
+        ),
+        "list: total_sum": page.where(Check.total > 200).limit(PAGE_SIZE + 1),
+        "detail: by check_id": BASE_CHECK_GET_QUERY.where(Check.customer_id == customer_id, Check.check_id == check_id),
+        "detail: by token": where_check_token(BASE_CHECK_GET_QUERY, token),
+        "line items of a page": select(ProductCheck).where(ProductCheck.check_id.in_(page_ids)),
+    }
+
+
+async def explain(db: AsyncSession, statements: Dict[str, Executable], verbose: bool) -> Dict[str, float]:
+    """
+    Run EXPLAIN ANALYZE of every statement.
+
+    :param db: database session
+    :param statements: statements by their description
+    :param verbose: print the whole plans
+    :return: execution time in milliseconds by statement description
+    """
+    timings = {}
+    for name, statement in statements.items():
+        plan = [row[0] for row in await db.execute(Explain(statement))]
+        if verbose:
+            logger.info(f"{name}\n" + "\n".join(plan))
+        match = re.search(r"Execution Time: ([\d.]+) ms", plan[-1])
+        timings[name] = float(match.group(1)) if match else float("nan")
+    return timings
+
+
+async def set_indexes(db: AsyncSession, enabled: bool) -> List[str]:
+    """
+    Drop or create the secondary indexes declared on the check models.
+
+    :param db: database session
+    :param enabled: create indexes when True, otherwise drop them
+    :return: names of affected indexes
+    """
+    indexes = [*Check.__table__.indexes, *ProductCheck.__table__.indexes]
+    for index in indexes:
+        ddl = CreateIndex(index, if_not_exists=True) if enabled else DropIndex(index, if_exists=True)
+        await db.execute(ddl)
+    await db.execute(text('ANALYZE "check", productcheck'))
+    await db.commit()
+    return [index.name for index in indexes]
+
+
+def print_report(before: Dict[str, float], after: Dict[str, float]) -> None:
+    rows: List[Tuple[str, str, str]] = [("query", "without indexes", "with indexes")]
+    for name in before:
+        rows.append((name, f"{before[name]:.2f} ms", f"{after[name]:.2f} ms"))
+    widths = [max(len(row[i]) for row in rows) for i in range(3)]
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Seed data and compare query timings without and with indexes
+    """
+    async with async_session() as db:
+        if args.customer_id:
+            customer_id = args.customer_id
+        else:
+            user_ids = await seed_checks(db, args.users, args.checks_per_user, args.products_per_check)
+            customer_id = user_ids[0]
+
+        statements = await build_statements(db, customer_id)
+
+        logger.info(f"Dropping indexes {await set_indexes(db, enabled=False)}")
+        before = await explain(db, statements, args.verbose)
+        logger.info(f"Creating indexes {await set_indexes(db, enabled=True)}")
+        after = await explain(db, statements, args.verbose)
+
+    print_report(before, after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--checks-per-user", type=int, default=20000)
+    parser.add_argument("--products-per-check", type=int, default=3)
+    parser.add_argument("--customer-id", type=int, help="explain on already seeded customer instead of seeding")
+    parser.add_argument("--verbose", action="store_true", help="print the query plans")
+    asyncio.run(main(parser.parse_args()))
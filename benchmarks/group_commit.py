@@ -0,0 +1,105 @@
+"""
+Compare creating checks by concurrent callers with a transaction per check, the way POST /checks/
+does by default, and through the group committer of CHECK_GROUP_COMMIT_ENABLED. Runs in-process
+against the local database, so only the transaction handling differs. Prints checks and commits
+per second and the latency of a single creation.
+
+Usage:
+    python -m benchmarks.group_commit --checks 2000 --concurrency 100 --window-ms 5
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import event, insert
+
+from api.checks import _prepare_check_values
+from benchmarks.common import summarize
+from core.enums import PaymentType
+from core.session import async_session, engine
+from db_cruds.check import DBCheckOps
+from db_cruds.group_commit import CheckGroupCommitter
+from deps import get_session_factory
+from models.all_models import Check, ProductCheck, User
+from schemas.check import CheckOrderInput
+
+
+async def create_user() -> int:
+    async with async_session() as db:
+        user_id = (
+            await db.execute(
+                insert(User).returning(User.user_id),
+                dict(first_name="Bench", last_name="Mark", email=f"{uuid.uuid4().hex}@example.com", hashed_password=""),
+            )
+        ).scalar()
+        await db.commit()
+    return user_id
+
+
+async def measure(name: str, create: Callable[[], Awaitable[None]], args: argparse.Namespace) -> None:
+    commits = 0
+
+    def count_commit(connection) -> None:
+        nonlocal commits
+        commits += 1
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def timed_create() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await create()
+            latencies.append(time.perf_counter() - started)
+
+    event.listen(engine.sync_engine, "commit", count_commit)
+    started = time.perf_counter()
+    await asyncio.gather(*[timed_create() for _ in range(args.checks)])
+    elapsed = time.perf_counter() - started
+    event.remove(engine.sync_engine, "commit", count_commit)
+
+    print(
+        f"{name:<22} {args.checks / elapsed:7.0f} checks/s {commits / elapsed:7.0f} commits/s "
+        f"commits={commits} {summarize(latencies)}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Create the same checks with both paths
+    """
+    customer_id = await create_user()
+    order = CheckOrderInput.model_validate({
+        "products": [{"name": f"product {i}", "price": 10, "quantity": 1} for i in range(args.products_per_check)],
+        "payment": {"type": PaymentType.CASH, "amount": 10 * args.products_per_check},
+    })
+    session_factory = get_session_factory()
+
+    async def create_in_own_transaction() -> None:
+        check_values, products = _prepare_check_values(order, customer_id)
+        async with session_factory() as session:
+            check = Check(**check_values)
+            check.details.extend(ProductCheck(**product) for product in products)
+            await DBCheckOps(session).create_check(check)
+
+    committer = CheckGroupCommitter(session_factory, window=args.window_ms / 1000, max_size=args.max_size)
+
+    async def create_group_committed() -> None:
+        await committer.create(*_prepare_check_values(order, customer_id))
+
+    await measure("transaction per check", create_in_own_transaction, args)
+    await measure("group commit", create_group_committed, args)
+    await committer.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100, help="callers creating checks at the same time")
+    parser.add_argument("--products-per-check", type=int, default=3)
+    parser.add_argument("--window-ms", type=float, default=5, help="CHECK_GROUP_COMMIT_WINDOW_IN_MILLISECONDS")
+    parser.add_argument("--max-size", type=int, default=100, help="CHECK_GROUP_COMMIT_MAX_SIZE")
+    asyncio.run(main(parser.parse_args()))
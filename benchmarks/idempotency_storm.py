@@ -0,0 +1,90 @@
+"""
+Send every order of a running application as a storm of concurrent retries and count the checks
+which were created, with and without the Idempotency-Key header.
+
+Usage:
+    python -m benchmarks.idempotency_storm --base-url http://localhost:8082 --orders 200 --retries 8
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+
+from httpx import AsyncClient
+
+from benchmarks.common import register_and_login, summarize
+from core.config import settings
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def send_order(
+        client: AsyncClient,
+        authorization: str,
+        idempotency_key: Optional[str],
+        check_ids: Set[int],
+        statuses: Dict[str, int],
+        latencies: List[float],
+) -> None:
+    payload = {
+        "products": [{"name": "product", "price": 10, "quantity": 1}],
+        "payment": {"type": "cash", "amount": 10},
+    }
+    headers = {"Authorization": authorization}
+    if idempotency_key is not None:
+        headers["Idempotency-Key"] = idempotency_key
+
+    started = time.perf_counter()
+    response = await client.post(f"{settings.API_PREFIX}/checks/", json=payload, headers=headers)
+    latencies.append(time.perf_counter() - started)
+
+    outcome = "replayed" if response.headers.get("Idempotent-Replayed") else str(response.status_code)
+    statuses[outcome] = statuses.get(outcome, 0) + 1
+    if response.status_code == 201:
+        check_ids.add(response.json()["check_id"])
+
+
+async def storm(client: AsyncClient, authorization: str, args: argparse.Namespace, with_keys: bool) -> None:
+    check_ids: Set[int] = set()
+    statuses: Dict[str, int] = {}
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send_order_retries() -> None:
+        key = uuid.uuid4().hex if with_keys else None
+        async with semaphore:
+            await asyncio.gather(*[
+                send_order(client, authorization, key, check_ids, statuses, latencies) for _ in range(args.retries)
+            ])
+
+    started = time.perf_counter()
+    await asyncio.gather(*[send_order_retries() for _ in range(args.orders)])
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{'with keys' if with_keys else 'without keys':<13} orders={args.orders} requests={len(latencies)} "
+        f"created={len(check_ids)} responses={statuses} {len(latencies) / elapsed:.1f} req/s {summarize(latencies)}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Run the retry storm without and with idempotency keys
+    """
+    async with AsyncClient(base_url=args.base_url, timeout=60) as client:
+        user = await register_and_login(client)
+        await storm(client, user["authorization"], args, with_keys=False)
+        await storm(client, user["authorization"], args, with_keys=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8082")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=8, help="concurrent requests of every order")
+    parser.add_argument("--concurrency", type=int, default=8, help="orders sent at the same time")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,73 @@
+"""
+Measure latency of GET /checks/my-checks of a running application alone and while
+concurrent clients keep logging in, which exercises bcrypt verification.
+
+Usage:
+    python -m benchmarks.login_storm --base-url http://localhost:8082 --duration 20 --login-clients 32
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List
+
+from httpx import AsyncClient
+
+from benchmarks.common import create_checks, register_and_login, summarize
+from core.config import settings
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def probe_checks(client: AsyncClient, authorization: str, deadline: float, latencies: List[float]) -> None:
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        response = await client.get(f"{settings.API_PREFIX}/checks/my-checks", headers={"Authorization": authorization})
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+
+
+async def login_storm(client: AsyncClient, user: Dict[str, str], deadline: float, statuses: Dict[int, int]) -> None:
+    credentials = {"user_email": user["user_email"], "password": user["password"]}
+    while time.monotonic() < deadline:
+        response = await client.post(f"{settings.API_PREFIX}/auth/login/", json=credentials)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def measure(client: AsyncClient, user: Dict[str, str], args: argparse.Namespace, login_clients: int) -> List[float]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    deadline = time.monotonic() + args.duration
+    await asyncio.gather(
+        *[probe_checks(client, user["authorization"], deadline, latencies) for _ in range(args.probe_clients)],
+        *[login_storm(client, user, deadline, statuses) for _ in range(login_clients)],
+    )
+    if statuses:
+        logger.info(f"login responses by status: {statuses}")
+    return latencies
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Compare /checks/my-checks latency without and with the login storm
+    """
+    async with AsyncClient(base_url=args.base_url, timeout=60) as client:
+        user = await register_and_login(client)
+        await create_checks(client, user["authorization"], count=20)
+
+        quiet = await measure(client, user, args, login_clients=0)
+        storm = await measure(client, user, args, login_clients=args.login_clients)
+
+    print(f"my-checks alone:            {summarize(quiet)}")
+    print(f"my-checks with login storm: {summarize(storm)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8082")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of every measurement")
+    parser.add_argument("--probe-clients", type=int, default=4)
+    parser.add_argument("--login-clients", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,111 @@
+"""
+Measure throughput and latency of GET /checks/my-checks for several connection pool settings.
+
+Every configuration starts its own uvicorn process with the settings passed as environment
+variables, so the database of the current environment must be reachable and migrated.
+
+Usage:
+    python -m benchmarks.pool_settings --clients 64 --duration 15
+    python -m benchmarks.pool_settings --config DB_POOL_SIZE=20,DB_MAX_OVERFLOW=0 --config DB_POOL_PRE_PING=false
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from httpx import AsyncClient, HTTPError
+
+from benchmarks.common import create_checks, register_and_login, summarize
+from core.config import settings
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIGS = [
+    "DB_POOL_SIZE=5,DB_MAX_OVERFLOW=10",
+    "DB_POOL_SIZE=5,DB_MAX_OVERFLOW=10,DB_POOL_PRE_PING=false",
+    "DB_POOL_SIZE=20,DB_MAX_OVERFLOW=10,DB_POOL_PRE_PING=false",
+    "DB_POOL_SIZE=20,DB_MAX_OVERFLOW=10,DB_POOL_PRE_PING=false,DB_PREPARED_STATEMENT_CACHE_SIZE=0",
+    "DB_POOL_SIZE=20,DB_MAX_OVERFLOW=10,DB_POOL_PRE_PING=false,DB_PGBOUNCER_TRANSACTION_MODE=true",
+]
+
+
+def parse_config(config: str) -> Dict[str, str]:
+    return dict(item.split("=", 1) for item in config.split(",") if item)
+
+
+async def wait_until_ready(client: AsyncClient, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.get("/metrics")
+            return
+        except HTTPError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def probe_checks(client: AsyncClient, authorization: str, deadline: float, latencies: List[float]) -> int:
+    errors = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        response = await client.get(f"{settings.API_PREFIX}/checks/my-checks", headers={"Authorization": authorization})
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors += 1
+    return errors
+
+
+async def measure(args: argparse.Namespace, config: Dict[str, str]) -> Tuple[float, List[float], int]:
+    port = str(args.port)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", port, "--log-level", "warning"],
+        env={**os.environ, **config, "SQL_INSTRUMENTATION_ENABLED": "false"},
+    )
+    try:
+        async with AsyncClient(base_url=f"http://localhost:{port}", timeout=60) as client:
+            await wait_until_ready(client)
+            user = await register_and_login(client)
+            await create_checks(client, user["authorization"], count=args.checks)
+
+            latencies: List[float] = []
+            deadline = time.monotonic() + args.duration
+            started = time.perf_counter()
+            errors = await asyncio.gather(
+                *[probe_checks(client, user["authorization"], deadline, latencies) for _ in range(args.clients)]
+            )
+            elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+    return len(latencies) / elapsed, latencies, sum(errors)
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Run the load against a fresh application process for every configuration
+    """
+    results = []
+    for config in args.config or DEFAULT_CONFIGS:
+        logger.info(f"measuring {config}")
+        throughput, latencies, errors = await measure(args, parse_config(config))
+        results.append((config, throughput, latencies, errors))
+
+    for config, throughput, latencies, errors in results:
+        print(f"{config:<100} {throughput:8.1f} req/s errors={errors} {summarize(latencies)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", help="comma separated SETTING=value pairs, repeatable")
+    parser.add_argument("--port", type=int, default=8083)
+    parser.add_argument("--duration", type=float, default=15, help="seconds of every measurement")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--checks", type=int, default=20, help="checks of the benchmark user")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+import logging
+import uuid
+from typing import List
+
+from sqlalchemy import Integer, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+logger = logging.getLogger(__name__)
+
+SEED_USERS_QUERY = text(
+    """
+    INSERT INTO "user" (first_name, last_name, email, hashed_password, create_date)
+    SELECT 'Seed', 'User ' || n, :email_prefix || n || '@example.com', 'not-a-hash', timezone('UTC', now())
+    FROM generate_series(1, :users) AS n
+    RETURNING user_id
+    """
+)
+
+SEED_CHECKS_QUERY = text(
+    """
+    INSERT INTO "check" (token, type, amount, total, rest, created_at, customer_id)
+    SELECT
+        gen_random_uuid(),
+        (CASE WHEN random() < 0.5 THEN 'CASH' ELSE 'CASHLESS' END)::payment_type,
+        0, 0, 0,
+        timezone('UTC', now()) - random() * make_interval(days => :days),
+        customer.user_id
+    FROM unnest(:user_ids) AS customer(user_id), generate_series(1, :checks_per_user)
+    """
+).bindparams(bindparam("user_ids", type_=ARRAY(Integer)))
+
+SEED_PRODUCTS_QUERY = text(
+    """
+    INSERT INTO productcheck (name, check_id, created_at, quantity, price)
+    SELECT
+        'product ' || (random() * 10000)::int, c.check_id, c.created_at,
+        1 + (random() * 4)::int, round((random() * 100)::numeric, 2)
+    FROM "check" AS c, generate_series(1, :products_per_check)
+    WHERE c.customer_id = ANY(:user_ids)
+    """
+).bindparams(bindparam("user_ids", type_=ARRAY(Integer)))
+
+SEED_TOKENS_QUERY = text(
+    """
+    INSERT INTO checktoken (token, check_id, created_at)
+    SELECT token, check_id, created_at FROM "check" WHERE customer_id = ANY(:user_ids)
+    """
+).bindparams(bindparam("user_ids", type_=ARRAY(Integer)))
+
+SEED_TOTALS_QUERY = text(
+    """
+    UPDATE "check"
+    SET total = totals.total, amount = ceil(totals.total), rest = ceil(totals.total) - totals.total
+    FROM (
+        SELECT check_id, SUM(price * quantity) AS total FROM productcheck GROUP BY check_id
+    ) AS totals
+    WHERE totals.check_id = "check".check_id AND "check".customer_id = ANY(:user_ids)
+    """
+).bindparams(bindparam("user_ids", type_=ARRAY(Integer)))
+
+
+async def seed_checks(
+    db: AsyncSession,
+    users: int,
+    checks_per_user: int,
+    products_per_check: int,
+    days: int = 365,
+) -> List[int]:
+    """
+    Fill the database with generated users, checks and line items.
+
+    :param db: database session
+    :param users: number of users to create
+    :param checks_per_user: number of checks created by every user
+    :param products_per_check: number of line items in every check
+    :param days: checks creation dates are spread over this number of last days
+    :return: ids of created users
+    """
+    email_prefix = f"seed-{uuid.uuid4().hex[:8]}-"
+    user_ids = list((await db.execute(SEED_USERS_QUERY, {"email_prefix": email_prefix, "users": users})).scalars())
+    logger.info(f"Created {len(user_ids)} users")
+
+    await db.execute(SEED_CHECKS_QUERY, {"user_ids": user_ids, "checks_per_user": checks_per_user, "days": days})
+    await db.execute(SEED_TOKENS_QUERY, {"user_ids": user_ids})
+    logger.info(f"Created {len(user_ids) * checks_per_user} checks")
+
+    await db.execute(SEED_PRODUCTS_QUERY, {"user_ids": user_ids, "products_per_check": products_per_check})
+    await db.execute(SEED_TOTALS_QUERY, {"user_ids": user_ids})
+    logger.info(f"Created {len(user_ids) * checks_per_user * products_per_check} line items")
+
+    await db.commit()
+    await db.execute(text('ANALYZE "user", "check", productcheck, checktoken'))
+    await db.commit()
+    return user_ids
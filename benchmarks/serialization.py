@@ -0,0 +1,84 @@
+"""
+Compare requests per second of a /my-checks sized page served through FastAPI's response_model
+validation and jsonable_encoder with PydanticJSONResponse. Runs in-process without the database,
+so only the serialization path differs.
+
+Usage:
+    python -m benchmarks.serialization --checks 100 --products 20 --duration 5
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Any
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from api.responses import PydanticJSONResponse
+from core.enums import PaymentType
+from schemas.check import CheckOut, Payment
+from schemas.pagination import CursorPage
+from schemas.product import Product
+
+
+def build_page(checks: int, products: int) -> CursorPage[CheckOut]:
+    items = [
+        CheckOut(
+            check_id=check_id,
+            created_at=datetime(2024, 1, 1, 12, 0, 0),
+            token=token,
+            url=f"http://localhost/api/checks/{token.hex}/show-public",
+            customer_name="Bench Mark",
+            total=products * 12.5,
+            rest=0.5,
+            payment=Payment(type=PaymentType.CASHLESS, amount=products * 12.5 + 0.5),
+            products=[Product(name=f"product {i}", price=12.5, quantity=1) for i in range(products)],
+        )
+        for check_id, token in enumerate(uuid.uuid4() for _ in range(checks))
+    ]
+    return CursorPage[CheckOut](items=items, size=checks, next_cursor="eyJjIjogMX0")
+
+
+def build_app(page: CursorPage[CheckOut]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response-model", response_model=CursorPage[CheckOut])
+    async def response_model_path() -> Any:
+        return page
+
+    @app.get("/pydantic-json", response_model=CursorPage[CheckOut])
+    async def pydantic_json_path() -> Any:
+        return PydanticJSONResponse(page)
+
+    return app
+
+
+async def measure(client: AsyncClient, path: str, duration: float) -> float:
+    requests = 0
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    while time.monotonic() < deadline:
+        response = await client.get(path)
+        response.raise_for_status()
+        requests += 1
+    return requests / (time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace) -> None:
+    page = build_page(args.checks, args.products)
+    async with AsyncClient(transport=ASGITransport(app=build_app(page)), base_url="http://bench") as client:
+        baseline, fast = (await client.get("/response-model")).json(), (await client.get("/pydantic-json")).json()
+        assert baseline == fast, "both paths must produce the same document"
+
+        for path in ("/response-model", "/pydantic-json"):
+            print(f"{path:<16} {await measure(client, path, args.duration):8.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=100, help="checks on the page")
+    parser.add_argument("--products", type=int, default=20, help="products of every check")
+    parser.add_argument("--duration", type=float, default=5, help="seconds of every measurement")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,122 @@
+"""
+Report table and index sizes of checks and their line items in the legacy layout (hex string
+tokens, stored urls, float money) and in the current compact one (uuid tokens, numeric money).
+
+Both layouts are built as temporary copies of the same seeded rows with the same indexes,
+so the sizes are comparable without migrating the database back and forth.
+
+Usage:
+    python -m benchmarks.storage_size --users 10 --checks-per-user 50000 --products-per-check 3
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, List
+
+from sqlalchemy import Integer, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.seed import seed_checks
+from core.session import async_session
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LAYOUTS = {
+    "legacy": {
+        "check": """
+            SELECT
+                check_id,
+                replace(token::text, '-', '')::varchar(50) AS token,
+                ('http://localhost:8000/api/checks/' || replace(token::text, '-', '') || '/show-public')::varchar(256)
+                    AS url,
+                type, amount::float8 AS amount, created_at, customer_id, total::float8 AS total, rest::float8 AS rest
+            FROM "check" WHERE customer_id = ANY(:user_ids)
+        """,
+        "productcheck": """
+            SELECT check_detail_id, name, p.check_id, quantity::float8 AS quantity, price::float8 AS price
+            FROM productcheck AS p JOIN "check" AS c ON c.check_id = p.check_id
+            WHERE c.customer_id = ANY(:user_ids)
+        """,
+    },
+    "compact": {
+        "check": """
+            SELECT check_id, token, type, amount, created_at, customer_id, total, rest
+            FROM "check" WHERE customer_id = ANY(:user_ids)
+        """,
+        "productcheck": """
+            SELECT check_detail_id, name, p.check_id, quantity, price
+            FROM productcheck AS p JOIN "check" AS c ON c.check_id = p.check_id
+            WHERE c.customer_id = ANY(:user_ids)
+        """,
+    },
+}
+
+# the indexes of the application tables, named by their role
+INDEXES = {
+    "check": {"pkey": "check_id", "token": "token", "customer_created": "customer_id, created_at, check_id"},
+    "productcheck": {"pkey": "check_detail_id", "check_id": "check_id"},
+}
+
+
+async def build_copy(db: AsyncSession, layout: str, table: str, user_ids: List[int]) -> Dict[str, int]:
+    """
+    Copy the seeded rows of the table into a temporary table of the layout and measure it
+
+    :return: sizes in bytes of the heap and of every index, and the average row width
+    """
+    copy = f"{layout}_{table}"
+    query = text(f"CREATE TEMP TABLE {copy} AS {LAYOUTS[layout][table]}")
+    await db.execute(query.bindparams(bindparam("user_ids", type_=ARRAY(Integer))), {"user_ids": user_ids})
+    for name, columns in INDEXES[table].items():
+        unique = "UNIQUE " if name in ("pkey", "token") else ""
+        await db.execute(text(f"CREATE {unique}INDEX {copy}_{name} ON {copy} ({columns})"))
+
+    sizes = {"heap": (await db.execute(text(f"SELECT pg_table_size('{copy}')"))).scalar()}
+    for name in INDEXES[table]:
+        sizes[name] = (await db.execute(text(f"SELECT pg_relation_size('{copy}_{name}')"))).scalar()
+    sizes["row_width"] = round((await db.execute(text(f"SELECT avg(pg_column_size(t.*)) FROM {copy} AS t"))).scalar())
+    return sizes
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:9.2f} MB"
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Seed data and compare the sizes of both layouts
+    """
+    async with async_session() as db:
+        user_ids = await seed_checks(db, args.users, args.checks_per_user, args.products_per_check)
+
+        rows = []
+        for table in INDEXES:
+            legacy = await build_copy(db, "legacy", table, user_ids)
+            compact = await build_copy(db, "compact", table, user_ids)
+            for part in ["heap", *INDEXES[table]]:
+                ratio = compact[part] / legacy[part] if legacy[part] else float("nan")
+                rows.append(
+                    f"{table:<13}{part:<18}{format_size(legacy[part])} -> {format_size(compact[part])}  x{ratio:.2f}"
+                )
+            legacy_total = sum(legacy[part] for part in ["heap", *INDEXES[table]])
+            compact_total = sum(compact[part] for part in ["heap", *INDEXES[table]])
+            rows.append(
+                f"{table:<13}{'total':<18}{format_size(legacy_total)} -> {format_size(compact_total)}  "
+                f"x{compact_total / legacy_total:.2f}"
+            )
+            rows.append(f"{table:<13}{'row width':<18}{legacy['row_width']:9d} B  -> {compact['row_width']:9d} B")
+        await db.rollback()
+
+    print(f"{'table':<13}{'relation':<18}{'legacy':>12}    {'compact':>12}")
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--checks-per-user", type=int, default=50000)
+    parser.add_argument("--products-per-check", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
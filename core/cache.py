@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from core.config import settings
+
+
+class LRUCache:
+    """
+    Bounded in-process cache which evicts the least recently used entries
+    and entries which outlived their time to live.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get cached value
+
+        :param key: cache key
+        :param default: value to return when the key is missing or expired
+        :return: cached value or default
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Put value into the cache evicting the least recently used entry when the cache is full
+
+        :param key: cache key
+        :param value: value to cache
+        :param ttl: time to live of the entry in seconds, the cache ttl by default
+        """
+        ttl = self._ttl if ttl is None else min(ttl, self._ttl)
+        if ttl <= 0 or self._max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Remove the entry from the cache if it is cached
+
+        :param key: cache key
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries and reset counters
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache usage counters
+        """
+        return {"size": len(self._entries), "max_size": self._max_size, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# rendered public check pages keyed by check token, checks never change after creation
+public_check_cache = LRUCache(
+    max_size=settings.PUBLIC_CHECK_CACHE_MAX_SIZE, ttl=settings.PUBLIC_CHECK_CACHE_TTL_IN_SECONDS
+)
+
+# authenticated users keyed by user id, invalidated by DBUserOps on every change of a user
+principal_cache = LRUCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_IN_SECONDS
+)
+
+# verified jwt payloads keyed by token digest, every entry expires together with its token
+token_payload_cache = LRUCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.API_REFRESH_TOKEN_EXPIRY_TIME_IN_MINUTES * 60
+)
@@ -1,5 +1,5 @@
 import secrets
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from pydantic.v1 import BaseSettings, validator, PostgresDsn
 
@@ -12,11 +12,72 @@ class Settings(BaseSettings):
     API_ACCESS_TOKEN_EXPIRY_TIME_IN_MINUTES: int = 2*60
     API_REFRESH_TOKEN_EXPIRY_TIME_IN_MINUTES: int = 24 * 60
 
+    CHECKS_PAGE_DEFAULT_SIZE: int = 50
+    CHECKS_PAGE_MAX_SIZE: int = 100
+    USERS_PAGE_DEFAULT_SIZE: int = 50
+    USERS_PAGE_MAX_SIZE: int = 100
+    CHECK_BATCH_MAX_SIZE: int = 1000
+    CHECK_EXPORT_BATCH_SIZE: int = 500
+    # checks of concurrent POST /checks/ requests without the Idempotency-Key header are inserted and committed
+    # together, a check waits for others at most the window, a batch reaching the max size is committed at once
+    CHECK_GROUP_COMMIT_ENABLED: bool = False
+    CHECK_GROUP_COMMIT_WINDOW_IN_MILLISECONDS: float = 5
+    CHECK_GROUP_COMMIT_MAX_SIZE: int = 100
+    # monthly partitions of check and productcheck created ahead by scripts/manage_partitions.py and
+    # the age in months of partitions it detaches, 0 keeps all partitions attached
+    CHECK_PARTITIONS_MONTHS_AHEAD: int = 3
+    CHECK_PARTITIONS_RETENTION_MONTHS: int = 0
+    # checks older than the age are moved to the checkarchive table by scripts/archive_checks.py,
+    # in batches with a pause between them
+    CHECK_ARCHIVE_AFTER_DAYS: int = 365
+    CHECK_ARCHIVE_BATCH_SIZE: int = 500
+    CHECK_ARCHIVE_PAUSE_IN_SECONDS: float = 0.5
+    # rows deleted by a single DELETE statement of drop_many and by a transaction of drop_many_in_transactions
+    DB_DELETE_BATCH_SIZE: int = 1000
+    # responses of POST /checks/ sent with the Idempotency-Key header are replayed to retries within the ttl
+    IDEMPOTENCY_KEY_TTL_IN_SECONDS: int = 24 * 60 * 60
+
+    PUBLIC_CHECK_CACHE_MAX_SIZE: int = 10000
+    PUBLIC_CHECK_CACHE_TTL_IN_SECONDS: int = 60 * 60
+
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_IN_SECONDS: int = 60
+
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # bcrypt runs in a pool of this size, requests waiting longer than the timeout get 503
+    PASSWORD_HASHING_WORKERS: int = 4
+    PASSWORD_HASHING_USE_PROCESSES: bool = False
+    PASSWORD_HASHING_QUEUE_TIMEOUT_IN_SECONDS: float = 5
+
+    # statement count and DB time of every request in the Server-Timing header and a log line
+    SQL_INSTRUMENTATION_ENABLED: bool = True
+
+    # connection pool of the engine, the pool size plus the overflow should fit max_connections of the server
+    # divided by the number of application processes
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_IN_SECONDS: float = 30
+    # -1 keeps connections forever
+    DB_POOL_RECYCLE_IN_SECONDS: int = -1
+    # pings every connection on checkout at the cost of a round trip, when disabled a stale connection
+    # fails its first statement and is invalidated, DB_POOL_RECYCLE_IN_SECONDS retires old connections
+    DB_POOL_PRE_PING: bool = True
+    # statements prepared by SQLAlchemy and kept per connection, 0 prepares every statement again
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # behind pgbouncer in transaction mode a prepared statement may not exist on the next server connection:
+    # the statement caches of SQLAlchemy and asyncpg are disabled and prepared statements get unique names
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = False
+
     POSTGRES_SERVER: str
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
+    # DSNs of read replicas as a JSON list, read only endpoints are spread over them
+    SQLALCHEMY_REPLICA_URIS: List[str] = []
+    # seconds a replica which failed to connect is left out of the rotation
+    REPLICA_RETRY_INTERVAL_IN_SECONDS: float = 30
     INITIALIZE_DB: bool
     DATA_DIRECTORY_PATH: str
 
@@ -17,3 +17,22 @@ class BaseStringEnum(str, Enum):
 class PaymentType(BaseStringEnum):
     CASH = "cash"
     CASHLESS = "cashless"
+
+
+class CursorDirection(BaseStringEnum):
+    NEXT = "next"
+    PREVIOUS = "prev"
+
+
+class ExportFormat(BaseStringEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class CheckLoadProfile(BaseStringEnum):
+    # the check row only
+    SUMMARY = "summary"
+    # the check with its products
+    DETAILED = "detailed"
+    # the check with its products and its customer
+    FULL = "full"
@@ -0,0 +1,131 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_STATEMENT_LOG_LENGTH = 500
+
+
+class SQLStats:
+    """
+    Statement count, total time and the slowest statement issued while a request is processed.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, duration: float) -> None:
+        self.statements += 1
+        self.total_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+
+# the stats object is shared by everything the request runs, including dependencies executed in
+# the threadpool, since they get a copy of the context which still points to the same object
+_request_sql_stats: ContextVar[Optional[SQLStats]] = ContextVar("request_sql_stats", default=None)
+
+
+def get_request_sql_stats() -> Optional[SQLStats]:
+    """
+    Returns stats of the request being processed or None outside of instrumented requests.
+    """
+    return _request_sql_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_time = conn.info["query_start_time"].pop()
+    stats = _request_sql_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - start_time)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute is not called for failed statements
+    start_times = exception_context.connection.info.get("query_start_time") \
+        if exception_context.connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def install_sql_instrumentation(engine: Engine) -> None:
+    """
+    Registers the engine event hooks which feed the stats of the current request.
+
+    :param engine: sync engine, use AsyncEngine.sync_engine for the async one
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _format_server_timing(stats: SQLStats, app_time: float) -> str:
+    return ", ".join([
+        f'db;dur={stats.total_time * 1000:.2f};desc="{stats.statements} statements"',
+        f"db-slowest;dur={stats.slowest_time * 1000:.2f}",
+        f"app;dur={app_time * 1000:.2f}",
+    ])
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Adds the Server-Timing header with DB stats of the request and logs them as a JSON line.
+
+    The header reflects the statements executed before the response starts, the log line is
+    written once the response is sent and so also covers streamed bodies.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = SQLStats()
+        token = _request_sql_stats.set(stats)
+        start_time = time.perf_counter()
+        status_code = None
+
+        async def send_with_server_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _format_server_timing(stats, time.perf_counter() - start_time))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            _request_sql_stats.reset(token)
+            route = scope.get("route")
+            logger.info(json.dumps({
+                "method": scope["method"],
+                "path": route.path if route is not None else scope["path"],
+                "status_code": status_code,
+                "duration_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                "db_statements": stats.statements,
+                "db_time_ms": round(stats.total_time * 1000, 2),
+                "db_slowest_ms": round(stats.slowest_time * 1000, 2),
+                "db_slowest_statement": (stats.slowest_statement or "")[:SLOWEST_STATEMENT_LOG_LENGTH] or None,
+            }))
@@ -0,0 +1,293 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.pool import Pool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.cache import LRUCache
+from core.pool import WaiterCountingQueuePool
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# requests which did not match any route share one label, otherwise scanners would blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """
+    Base of metrics rendered in the Prometheus text exposition format.
+    """
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def _check_labels(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        """
+        Lines of the samples of the metric
+        """
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._check_labels(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(self._check_labels(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[self._check_labels(labels)] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._check_labels(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(self._check_labels(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class CallbackGauge(Metric):
+    """
+    Gauge whose samples are read from a callback when the metrics are rendered.
+    """
+    type_name = "gauge"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+            label_names: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, label_names)
+        self._callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._callback():
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            label_names: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # per label values: count of observations in each bucket (not cumulative), sum and count
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        key = self._check_labels(labels)
+        if key not in self._values:
+            self._values[key] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+        bucket_counts, totals = self._values[key]
+        bucket_counts[bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def get_count(self, *labels: str) -> int:
+        values = self._values.get(self._check_labels(labels))
+        return int(values[1][1]) if values is not None else 0
+
+    def samples(self) -> Iterable[str]:
+        for labels, (bucket_counts, (total, count)) in self._values.items():
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.label_names, labels, ("le", _format_value(upper_bound)))
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.label_names, labels)} {int(count)}"
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+        """
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "Count of processed HTTP requests.", ("method", "route", "status_code")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests in seconds.", ("method", "route")
+))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "Count of HTTP requests being processed.", ("method",)
+))
+
+
+_pools: Dict[str, Pool] = {}
+_caches: Dict[str, LRUCache] = {}
+
+
+def _read_pools(read: Callable[[Pool], float]) -> Callable[[], Iterable[Tuple[LabelValues, float]]]:
+    return lambda: (((name,), read(pool)) for name, pool in _pools.items())
+
+
+def _read_caches(stat: str) -> Callable[[], Iterable[Tuple[LabelValues, float]]]:
+    return lambda: (((name,), cache.stats()[stat]) for name, cache in _caches.items())
+
+
+registry.register(CallbackGauge(
+    "db_pool_size", "Configured size of the DB connection pool.", _read_pools(lambda pool: pool.size()), ("pool",)
+))
+registry.register(CallbackGauge(
+    "db_pool_checked_out", "Count of DB connections in use.", _read_pools(lambda pool: pool.checkedout()), ("pool",)
+))
+registry.register(CallbackGauge(
+    "db_pool_overflow",
+    "Count of DB connections opened above the pool size.",
+    _read_pools(lambda pool: max(pool.overflow(), 0)),
+    ("pool",),
+))
+registry.register(CallbackGauge(
+    "db_pool_waiters",
+    "Count of callers waiting for a DB connection while the pool and its overflow are checked out.",
+    _read_pools(lambda pool: pool.waiters if isinstance(pool, WaiterCountingQueuePool) else 0),
+    ("pool",),
+))
+registry.register(CallbackGauge("cache_size", "Count of entries in the cache.", _read_caches("size"), ("cache",)))
+registry.register(CallbackGauge(
+    "cache_hits", "Count of cache hits since the cache was cleared.", _read_caches("hits"), ("cache",)
+))
+registry.register(CallbackGauge(
+    "cache_misses", "Count of cache misses since the cache was cleared.", _read_caches("misses"), ("cache",)
+))
+
+
+def register_pool(name: str, pool: Pool) -> None:
+    """
+    Exposes gauges of the connection pool, they are read at the time metrics are rendered.
+
+    :param name: value of the pool label
+    :param pool: pool of the engine, use engine.pool
+    """
+    _pools[name] = pool
+
+
+def register_cache(name: str, cache: LRUCache) -> None:
+    """
+    Exposes size, hits and misses of the in-process cache.
+
+    :param name: value of the cache label
+    :param cache: cache instance
+    """
+    _caches[name] = cache
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status code and in-flight count of HTTP requests labeled by the route template.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start_time = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec(method)
+            # the router stores the matched route in the scope
+            route = scope.get("route")
+            route_path = route.path if route is not None else UNMATCHED_ROUTE
+            http_request_duration_seconds.observe(method, route_path, value=time.perf_counter() - start_time)
+            http_requests_total.inc(method, route_path, str(status_code))
@@ -0,0 +1,28 @@
+from typing import Any, Callable, Optional
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+
+class WaiterCountingQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool of the async engines which counts callers waiting for a connection, every connection of the pool
+    and its overflow is checked out. SQLAlchemy pools expose checked out and overflow counts only.
+    """
+
+    def __init__(self, creator: Callable[..., Any], pool_size: int = 5, max_overflow: int = 10, **kw: Any):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        # pools without a size limit or with unlimited overflow never make callers wait
+        self._connection_limit: Optional[int] = (
+            pool_size + max_overflow if pool_size > 0 and max_overflow > -1 else None
+        )
+        self.waiters = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        if self._connection_limit is None or self.checkedout() < self._connection_limit:
+            return super()._do_get()
+
+        self.waiters += 1
+        try:
+            return super()._do_get()
+        finally:
+            self.waiters -= 1
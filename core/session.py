@@ -1,22 +1,189 @@
+import itertools
 import re
+import time
+import uuid
 from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from asyncpg import exceptions
 from fastapi import HTTPException
 from fastapi.exceptions import RequestValidationError
-from sqlalchemy.exc import DataError, IntegrityError
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from starlette import status
 
 from core.config import settings
+from core.pool import WaiterCountingQueuePool
 
-engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+
+def get_engine_options() -> Dict[str, Any]:
+    """
+    Pool and driver options of the engines built from settings.
+    """
+    connect_args: Dict[str, Any] = {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+    if settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        connect_args.update(
+            prepared_statement_cache_size=0,
+            statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__",
+        )
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_IN_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_IN_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+        "poolclass": WaiterCountingQueuePool,
+    }
+
+
+engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, **get_engine_options())
 
 async_session = sessionmaker(
     bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False, autocommit=False
 )
 
+class ReplicaRouter:
+    """
+    Picks the engine of read sessions: replicas in round-robin order or the primary when no replica is healthy.
+
+    A replica which fails to connect or loses a connection is skipped for the retry interval, then it gets
+    traffic again. Read engines run statements in autocommit mode without BEGIN/COMMIT round trips,
+    server-side cursors need a transaction so streamed reads get engines which begin a READ ONLY one.
+    """
+
+    def __init__(self, primary: AsyncEngine, replica_uris: List[str], retry_interval: float):
+        self.replicas = [create_async_engine(uri, **get_engine_options()) for uri in replica_uris]
+        self._retry_interval = retry_interval
+        self._unhealthy_until: Dict[int, float] = {}
+        self._round_robin = itertools.count()
+
+        # option engines share the pool of the engine they are made of
+        self.primary_read_engine = primary.execution_options(isolation_level="AUTOCOMMIT")
+        self.primary_read_only_transaction_engine = primary.execution_options(postgresql_readonly=True)
+        self._read_engines = [replica.execution_options(isolation_level="AUTOCOMMIT") for replica in self.replicas]
+        self._read_only_transaction_engines = [
+            replica.execution_options(postgresql_readonly=True) for replica in self.replicas
+        ]
+        self._replica_indexes = {
+            read_engine.sync_engine: index
+            for index, read_engine in [*enumerate(self._read_engines), *enumerate(self._read_only_transaction_engines)]
+        }
+
+        for index, replica in enumerate(self.replicas):
+            event.listen(replica.sync_engine, "handle_error", partial(self._handle_error, index))
+
+    def _handle_error(self, index: int, exception_context: ExceptionContext) -> None:
+        if exception_context.is_disconnect:
+            self.mark_unhealthy(index)
+
+    def mark_unhealthy(self, index: int) -> None:
+        self._unhealthy_until[index] = time.monotonic() + self._retry_interval
+
+    def _next_healthy_replica(self) -> Optional[int]:
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            index = next(self._round_robin) % len(self.replicas)
+            if self._unhealthy_until.get(index, 0) <= now:
+                return index
+        return None
+
+    def get_read_engine(self) -> AsyncEngine:
+        index = self._next_healthy_replica()
+        return self.primary_read_engine if index is None else self._read_engines[index]
+
+    def get_read_only_transaction_engine(self) -> AsyncEngine:
+        index = self._next_healthy_replica()
+        if index is None:
+            return self.primary_read_only_transaction_engine
+        return self._read_only_transaction_engines[index]
+
+    @asynccontextmanager
+    async def track_health(self, session: AsyncSession):
+        """
+        Leaves the replica of a read session out of the rotation when it can not be connected. The driver
+        raises OSError for refused or timed out connections, they do not reach the handle_error event.
+        """
+        try:
+            yield
+        except OSError:
+            index = self._replica_indexes.get(session.sync_session.bind)
+            if index is not None:
+                self.mark_unhealthy(index)
+            raise
+
+    def reads_from_replica(self, session: AsyncSession) -> bool:
+        """
+        Whether statements of the read session run on a replica
+
+        :param session: read session
+        """
+        return session.sync_session.bind in self._replica_indexes
+
+    @asynccontextmanager
+    async def primary_read_session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Short-lived read session on the primary, used when a replica misses a row which could be written
+        a moment ago and not be replicated yet. The request session keeps its replica connection only,
+        the primary connection goes back to the pool when the block ends.
+        """
+        async with async_read_session(bind=self.primary_read_engine) as session:
+            yield session
+
+
+replica_router = ReplicaRouter(engine, settings.SQLALCHEMY_REPLICA_URIS, settings.REPLICA_RETRY_INTERVAL_IN_SECONDS)
+
+# sessions get the engine picked by the replica router when created
+async_read_session = sessionmaker(
+    bind=replica_router.primary_read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+    autocommit=False,
+)
+async_read_only_transaction_session = sessionmaker(
+    bind=replica_router.primary_read_only_transaction_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+    autocommit=False,
+)
+
+
+def database_error_to_http_exception(e: DBAPIError) -> HTTPException:
+    """
+    Builds the response of a request whose statement was rejected by the database.
+
+    :param e: The error raised by the statement
+
+    :returns: 422 for rows violating constraints or data types of columns, 500 for all other errors.
+    """
+    sqlstate = getattr(e.orig, "sqlstate", None) or ""
+    if isinstance(e, IntegrityError):
+        if sqlstate == exceptions.UniqueViolationError.sqlstate:
+            # see https://github.com/MagicStack/asyncpg/issues/227
+            match = re.search(r"DETAIL:[\w\W]*?\(([\w\W]+?)\)=\(([\w\W]+?)\)([\W\w]+)", str(e.orig))
+            msg = f"{match.group(1).replace('_', ' ').capitalize()} {match.group(2)}{match.group(3)}"
+        elif sqlstate == exceptions.ForeignKeyViolationError.sqlstate:
+            msg = f"Foreign key violation: {e}"
+        else:
+            msg = f"Database validation error: {e}"
+        return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=msg)
+    if sqlstate == exceptions.InvalidTextRepresentationError.sqlstate:
+        msg = f"Invalid input value: {e}"
+        return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=msg)
+    # values rejected by asyncpg before they are sent, like an integer out of the int4 range, and values
+    # too long for their columns are not DataError of SQLAlchemy but carry the data exception class 22
+    if isinstance(e, DataError) or sqlstate.startswith("22"):
+        msg = f"Database input error: {e}"
+        return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=msg)
+    msg = f"Could not process the record: {e}"
+    return HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
 
 
 @asynccontextmanager
@@ -28,27 +195,9 @@ async def run_transaction(session: AsyncSession):
     try:
         yield
         await transaction.commit()
-    except IntegrityError as e:
+    except DBAPIError as e:
         await transaction.rollback()
-        if e.orig.sqlstate == exceptions.UniqueViolationError.sqlstate:
-            # see https://github.com/MagicStack/asyncpg/issues/227
-            match = re.search(r"DETAIL:[\w\W]*?\(([\w\W]+?)\)=\(([\w\W]+?)\)([\W\w]+)", str(e.orig))
-            msg = f"{match.group(1).replace('_', ' ').capitalize()} {match.group(2)}{match.group(3)}"
-            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=msg)
-        elif e.orig.sqlstate == exceptions.ForeignKeyViolationError.sqlstate:
-            msg = f"Foreign key violation: {e}"
-            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=msg)
-        else:
-            msg = f"Database validation error: {e}"
-            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=msg)
-    except DataError as e:
-        await transaction.rollback()
-        if e.orig.sqlstate == exceptions.InvalidTextRepresentationError.sqlstate:
-            msg = f"Invalid input value: {e}"
-            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=msg)
-        else:
-            msg = f"Database input error: {e}"
-            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=msg)
+        raise database_error_to_http_exception(e)
     except (HTTPException, RequestValidationError) as e:
         await transaction.rollback()
         raise e
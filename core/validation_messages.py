@@ -1 +1,2 @@
 NOT_ENOUGH_MONEY = "The provided money are not sufficient to make the purchase"
+IDEMPOTENCY_KEY_REUSED = "The idempotency key was already used with another payload"
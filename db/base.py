@@ -2,5 +2,5 @@
 # imported by Alembic
 
 from models.base import BaseClass # noqa: F401
-from models.all_models import User, Check, ProductCheck  # noqa: F401
+from models.all_models import User, Check, ProductCheck, IdempotencyKey, CheckToken, CheckArchive  # noqa: F401
 
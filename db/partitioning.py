@@ -0,0 +1,112 @@
+"""
+Monthly range partitions of the check and productcheck tables.
+
+Both tables are partitioned by created_at. A line item copies created_at of its check, so the
+line items of a check are stored in the partition of the same month as the check. Rows out of
+the range of the created partitions land in the default partition of the table.
+"""
+import re
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# productcheck references check, so its partitions are detached first
+PARTITIONED_TABLES = ("productcheck", "check")
+
+PARTITION_NAME_PATTERN = re.compile(r"^(?P<table>[a-z_]+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+class Partition(NamedTuple):
+    table: str
+    name: str
+    month: date
+
+
+def month_start(value: Union[date, datetime]) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def parse_partition_name(name: str) -> Optional[Partition]:
+    """
+    Get the partition of the name or None when the name is not a name of a monthly partition
+    """
+    match = PARTITION_NAME_PATTERN.match(name)
+    if match is None or match.group("table") not in PARTITIONED_TABLES:
+        return None
+    return Partition(match.group("table"), name, date(int(match.group("year")), int(match.group("month")), 1))
+
+
+def is_partition_name(name: str) -> bool:
+    """
+    Whether the table name is a name of a monthly or default partition, attached or detached
+    """
+    return parse_partition_name(name) is not None or name in map(default_partition_name, PARTITIONED_TABLES)
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def create_default_partition_sql(table: str) -> str:
+    return f'CREATE TABLE IF NOT EXISTS "{default_partition_name(table)}" PARTITION OF "{table}" DEFAULT'
+
+
+def detach_partition_sql(partition: Partition) -> str:
+    return f'ALTER TABLE "{partition.table}" DETACH PARTITION "{partition.name}"'
+
+
+def delete_check_tokens_sql(partition: Partition) -> str:
+    """
+    Tokens of checks of the month reference the check partition, they are deleted before it is detached
+    """
+    return (
+        f"DELETE FROM checktoken WHERE created_at >= '{partition.month.isoformat()}' "
+        f"AND created_at < '{add_months(partition.month, 1).isoformat()}'"
+    )
+
+
+async def get_partitions(connection: AsyncConnection, table: str) -> List[Partition]:
+    """
+    Get monthly partitions attached to the table, the oldest first.
+
+    :param connection: database connection
+    :param table: name of the partitioned table
+    :return: the partitions, the default partition is not included
+    """
+    query = text(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+        """
+    )
+    names = (await connection.execute(query, {"table": table})).scalars()
+    partitions = [parse_partition_name(name) for name in names]
+    return sorted((partition for partition in partitions if partition is not None), key=lambda p: p.month)
+
+
+async def count_default_partition_rows(connection: AsyncConnection, table: str) -> int:
+    """
+    Count rows which did not fit any monthly partition of the table
+    """
+    return (await connection.execute(text(f'SELECT count(*) FROM "{default_partition_name(table)}"'))).scalar()
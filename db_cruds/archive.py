@@ -0,0 +1,79 @@
+import json
+import zlib
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.enums import CheckLoadProfile
+from db_cruds.base import DBConnectorBase
+from db_cruds.check import DBCheckOps
+from db_cruds.queries import BASE_CHECK_GET_QUERY, CHECK_LOAD_OPTIONS
+from models.all_models import Check, CheckArchive, ProductCheck
+
+
+class DBCheckArchiveOps(DBConnectorBase[CheckArchive, BaseModel, BaseModel]):
+    """CheckArchive class to move old checks with their products out of the check and productcheck tables"""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, CheckArchive)
+
+    async def count_archivable(self, cutoff: datetime) -> int:
+        """
+        Count checks created before the cutoff which are not archived yet.
+
+        :param cutoff: The checks created before are archived
+
+        :returns: The count of checks.
+        """
+        query = select(func.count()).select_from(Check).where(Check.created_at < cutoff)
+        return (await self._db.execute(query)).scalar()
+
+    async def archive_batch(self, cutoff: datetime, batch_size: int) -> int:
+        """
+        Move a batch of the oldest checks created before the cutoff with their products to the archive.
+
+        The batch is locked with SKIP LOCKED, so checks locked by a request or another archiving job are left
+        for the next batch. Checks and products are deleted by their primary keys, which contain the partition
+        key, so only partitions of the archived months are touched.
+
+        :param cutoff: The checks created before are archived
+        :param batch_size: The maximal count of checks to archive
+
+        :returns: The count of archived checks.
+        """
+        query = (
+            BASE_CHECK_GET_QUERY.options(*CHECK_LOAD_OPTIONS[CheckLoadProfile.DETAILED])
+            .where(Check.created_at < cutoff)
+            .order_by(Check.created_at, Check.check_id)
+            .limit(batch_size)
+            .with_for_update(of=Check, skip_locked=True)
+        )
+        result = (await self._db.execute(query)).all()
+        if not result:
+            return 0
+
+        archived = []
+        for check, check_creator in result:
+            check_out = DBCheckOps._convert_base_query_result_to_check_schema(check, check_creator=check_creator)
+            archived.append(
+                dict(
+                    check_id=check.check_id,
+                    token=check.token,
+                    customer_id=check.customer_id,
+                    created_at=check.created_at,
+                    # money is kept as decimal strings, JSON numbers of the API would drop trailing zeros of cents
+                    payload=zlib.compress(json.dumps(check_out.model_dump(exclude={"url"}), default=str).encode()),
+                )
+            )
+        # checks are inserted and deleted in one transaction, an archived check is never found again,
+        # so a conflict is an error which rolls the batch back instead of deleting a check left unarchived
+        await self._db.execute(insert(CheckArchive), archived)
+
+        keys = [(check.check_id, check.created_at) for check, _ in result]
+        await self._db.execute(
+            delete(ProductCheck).where(tuple_(ProductCheck.check_id, ProductCheck.created_at).in_(keys))
+        )
+        await self._db.execute(delete(Check).where(tuple_(Check.check_id, Check.created_at).in_(keys)))
+        return len(result)
@@ -1,14 +1,19 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import (
+    Any, AsyncContextManager, AsyncIterator, Callable, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union,
+)
 
 from fastapi import HTTPException
 from pydantic import BaseModel
-from sqlalchemy import delete, select
+from sqlalchemy import Select, delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
 from starlette import status
 
+from core.config import settings
+from core.session import replica_router
 from models.base import BaseClass
+from utils import decode_cursor, encode_cursor
 
 ModelType = TypeVar("ModelType", bound=BaseClass)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -38,8 +43,12 @@ class DBConnectorBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             .options(*[joinedload(field) for field in relations] if relations else [])
             .filter(self.model.pk() == object_pk)
         )
-        result = await self._db.execute(query)
-        return result.scalars().first()
+        obj = (await self._db.execute(query)).scalars().first()
+        if obj is None and replica_router.reads_from_replica(self._db):
+            # the object could be created a moment ago and not be replicated yet
+            async with replica_router.primary_read_session() as primary_session:
+                obj = (await primary_session.execute(query)).scalars().first()
+        return obj
 
     async def get_or_raise_404(self, object_pk: Any, relations: Optional[List[str]] = None) -> ModelType:
         """
@@ -57,7 +66,11 @@ class DBConnectorBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return obj
 
     async def get_list(
-        self, relations: Optional[List[ModelType]] = None, filters: Optional[Dict[str, Any]] = None
+        self,
+        relations: Optional[List[ModelType]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        after: Optional[Any] = None,
     ) -> List[ModelType]:
         """
         Fetches multiple records from the database of a given model (ModelType).
@@ -66,21 +79,98 @@ class DBConnectorBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             attributes to join as outer left join.
         :param filters: Dictionary of filters to apply.
             The str name of model field and appropriate value to filter by it
+        :param limit: The maximal number of records, records are ordered by primary key when limited
+        :param after: The primary key of the last record of the previous page, for keyset pagination
 
         :returns: List of model instances.
         """
 
-        query = select(self.model)
-        if filters:
-            for field, value in filters.items():
-                query = query.where(getattr(self.model, field) == value)
+        query = self._filter_query(select(self.model), filters)
+
+        if limit is not None or after is not None:
+            query = query.order_by(self.model.pk())
+        if after is not None:
+            query = query.where(self.model.pk() > after)
+        if limit is not None:
+            query = query.limit(limit)
 
         if relations:
-            query = query.options(*[joinedload(field) for field in relations])
+            # joined collections would multiply rows and break the limit
+            query = query.options(*[selectinload(field) if limit else joinedload(field) for field in relations])
 
         result = await self._db.execute(query)
         return result.unique().scalars().all()
 
+    async def get_page(
+        self,
+        size: int,
+        cursor: Optional[str] = None,
+        relations: Optional[List[ModelType]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Fetches one page of records ordered by primary key with keyset pagination.
+
+        :param size: The number of records in the page
+        :param cursor: The opaque cursor returned with the previous page
+        :param relations: List of child relationships names as string
+        :param filters: Dictionary of filters to apply.
+
+        :returns: The records of the page and the cursor of the next page or None for the last page.
+        """
+        after = None
+        if cursor:
+            try:
+                # the cursor comes from the client, its key is checked like any other input
+                after = self.model.pk().type.python_type(decode_cursor(cursor)["after"])
+            except (ValueError, KeyError, TypeError):
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor")
+
+        # one extra record tells whether there is anything beyond the page
+        records = await self.get_list(relations=relations, filters=filters, limit=size + 1, after=after)
+        if len(records) <= size:
+            return records, None
+        records = records[:size]
+        return records, encode_cursor({"after": getattr(records[-1], self.model.pk().key)})
+
+    async def stream_list(
+        self,
+        relations: Optional[List[ModelType]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[ModelType]:
+        """
+        Streams all records ordered by primary key through a server side cursor, batch_size records
+        at a time. The session must be in a transaction.
+
+        :param relations: List of child relationships names as string
+        :param filters: Dictionary of filters to apply.
+        :param batch_size: The number of records fetched from the cursor at once
+
+        :returns: Async iterator over model instances.
+        """
+        query = (
+            self._filter_query(select(self.model), filters)
+            .order_by(self.model.pk())
+            .execution_options(yield_per=batch_size)
+        )
+        if relations:
+            query = query.options(*[selectinload(field) for field in relations])
+
+        result = await self._db.stream(query)
+        try:
+            async for partition in result.scalars().partitions():
+                for record in partition:
+                    yield record
+        finally:
+            await result.close()
+
+    def _filter_query(self, query: Select, filters: Optional[Dict[str, Any]]) -> Select:
+        if filters:
+            for field, value in filters.items():
+                query = query.where(getattr(self.model, field) == value)
+        return query
+
     async def _convert_schema_to_dict(
         self,
         obj: Union[CreateSchemaType, UpdateSchemaType, Dict[str, Any]],
@@ -138,11 +228,37 @@ class DBConnectorBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         query = delete(self.model).where(self.model.pk() == object_pk)
         await self._db.execute(query)
 
-    async def drop_many(self, object_ids: List[int]):
+    async def drop_many(self, object_ids: List[int], batch_size: Optional[int] = None):
         """
-        Remove model instance
+        Remove model instances, batch_size of them by every DELETE statement
+
+        The statements run in the transaction of the session, so the rows of all batches stay locked until
+        the caller commits, use drop_many_in_transactions to release them batch by batch.
 
         :param object_ids: primary keys of objects that are deleted
+        :param batch_size: the count of objects deleted by one statement, settings.DB_DELETE_BATCH_SIZE by default
         """
-        query = delete(self.model).where(self.model.pk().in_(object_ids))
-        await self._db.execute(query)
+        batch_size = batch_size or settings.DB_DELETE_BATCH_SIZE
+        for start in range(0, len(object_ids), batch_size):
+            query = delete(self.model).where(self.model.pk().in_(object_ids[start:start + batch_size]))
+            await self._db.execute(query)
+
+    @classmethod
+    async def drop_many_in_transactions(
+            cls,
+            session_factory: Callable[[], AsyncContextManager[AsyncSession]],
+            object_ids: List[int],
+            batch_size: Optional[int] = None,
+    ) -> None:
+        """
+        Remove model instances, every batch_size of them in a transaction of its own, so rows of a committed
+        batch are unlocked while the next one is deleted. An error stops at its batch, the ones before stay deleted.
+
+        :param session_factory: sessions committing when their block ends, e.g. deps.get_session_factory()
+        :param object_ids: primary keys of objects that are deleted
+        :param batch_size: the count of objects deleted by one transaction, settings.DB_DELETE_BATCH_SIZE by default
+        """
+        batch_size = batch_size or settings.DB_DELETE_BATCH_SIZE
+        for start in range(0, len(object_ids), batch_size):
+            async with session_factory() as session:
+                await cls(session).drop_many(object_ids[start:start + batch_size], batch_size)
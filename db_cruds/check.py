@@ -1,15 +1,27 @@
-from typing import Union, Dict, Any, Optional, List
+import zlib
+from datetime import datetime, time, timedelta
+from typing import AsyncIterator, Union, Dict, Any, List, Optional, Tuple
+from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import func
+from sqlalchemy import Select, Subquery, and_, func, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from db_cruds.base import DBConnectorBase, CreateSchemaType, ModelType
-from db_cruds.queries import BASE_CHECK_GET_QUERY, COUNT_TOTAL_AND_REST_QUERY, BASE_CHECK_GET_LIST_QUERY
-from models.all_models import Check, ProductCheck
+from core.enums import CheckLoadProfile, CursorDirection
+from core.session import replica_router
+from db_cruds.queries import (
+    BASE_CHECK_GET_QUERY,
+    BASE_CHECK_GET_LIST_QUERY,
+    CHECK_LOAD_OPTIONS,
+    where_check_token,
+)
+from models.all_models import Check, CheckArchive, CheckToken, ProductCheck
 from schemas.check import CheckOrderInput, UpdateCheck, CheckOut, Payment
+from schemas.pagination import CursorPage
 from schemas.product import Product
+from utils import encode_cursor, decode_cursor, to_naive_utc
 
 
 class DBCheckOps(DBConnectorBase[Check, CheckOrderInput, UpdateCheck]):
@@ -32,45 +44,263 @@ class DBCheckOps(DBConnectorBase[Check, CheckOrderInput, UpdateCheck]):
 
         self._db.add(check)
         await self._db.flush([check])
+        await self._db.execute(
+            insert(CheckToken).values(token=check.token, check_id=check.check_id, created_at=check.created_at)
+        )
         return check
 
-    async def get_user_checks_with_details(self, customer_id: int, filters: Optional[Dict[Any, Any]]) -> List[CheckOut]:
+    async def get_check(
+            self,
+            check_id: int,
+            profile: CheckLoadProfile = CheckLoadProfile.SUMMARY,
+    ) -> Optional[Check]:
+        """
+        Get the check model instance with the relationships of the loading profile.
+
+        :param check_id: The unique identifier for the check
+        :param profile: The relationships to load with the check
+
+        :returns: The check or None.
         """
-        Fetches multiple records from the database checks by user id as customer_id.
+        query = select(Check).options(*CHECK_LOAD_OPTIONS[profile]).where(Check.check_id == check_id)
+        return (await self._db.execute(query)).unique().scalar_one_or_none()
+
+    async def create_checks_bulk(
+            self,
+            checks: List[Dict[str, Any]],
+            products: List[List[Dict[str, Any]]],
+    ) -> List[Tuple[int, datetime]]:
+        """
+        Insert many checks and their products with multi-row INSERT ... RETURNING statements.
+
+        :param checks: The column values of the checks
+        :param products: The column values of products of every check, in the same order as checks
+
+        :returns: The check_id and created_at of every inserted check, in the same order as checks.
+        """
+        created = (
+            await self._db.execute(
+                insert(Check).returning(Check.check_id, Check.created_at, sort_by_parameter_order=True),
+                checks,
+            )
+        ).all()
+
+        products_values = [
+            # line items are stored in the partition of their check
+            dict(product, check_id=check_id, created_at=created_at)
+            for (check_id, created_at), check_products in zip(created, products)
+            for product in check_products
+        ]
+        await self._db.execute(insert(ProductCheck), products_values)
+        await self._db.execute(
+            insert(CheckToken),
+            [
+                dict(token=check["token"], check_id=check_id, created_at=created_at)
+                for check, (check_id, created_at) in zip(checks, created)
+            ],
+        )
+        return [(check_id, created_at) for check_id, created_at in created]
+
+    async def get_user_checks_with_details(
+            self,
+            customer_id: int,
+            filters: Optional[Dict[Any, Any]],
+            size: int,
+            cursor: Optional[str] = None,
+            page: Optional[int] = None,
+            search: Optional[str] = None,
+    ) -> CursorPage[CheckOut]:
+        """
+        Fetches one page of checks created by user with id customer_id, the newest first.
+
+        The page is selected with keyset pagination on (created_at, check_id) by default,
+        or with LIMIT/OFFSET when page number is provided. With search only checks having a product
+        whose name contains the search text are returned, the best matching first.
 
-        :param customer_id:
+        :param customer_id: The unique identifier of a user who created checks
         :param filters: Dictionary of filters to apply.
             The str name of model field and appropriate value to filter by it
+        :param size: The number of checks in the page
+        :param cursor: The opaque cursor of the page returned by previous call
+        :param page: The number of the page, starting from 1, to use LIMIT/OFFSET pagination instead of cursor
+        :param search: The text to search in names of products of the checks
 
-        :returns: List of model instances.
+        :returns: The page of checks with cursors of neighbouring pages.
         """
-        query = BASE_CHECK_GET_LIST_QUERY.where(Check.customer_id == customer_id)
+        base_query = BASE_CHECK_GET_LIST_QUERY.options(*CHECK_LOAD_OPTIONS[CheckLoadProfile.DETAILED])
+        query = self._filter_checks_query(base_query.where(Check.customer_id == customer_id), filters)
 
-        if filters:
-            if total_sum := filters["total_sum"]:
-                query = query.having(func.sum(ProductCheck.price*ProductCheck.quantity) > total_sum)
+        order_columns = [Check.created_at, Check.check_id]
+        if search:
+            matches = self._product_name_matches_query(customer_id, search)
+            query = query.join(
+                matches, and_(matches.c.check_id == Check.check_id, matches.c.created_at == Check.created_at)
+            ).add_columns(matches.c.rank)
+            order_columns.insert(0, matches.c.rank)
 
-            if payment_type := filters["payment_type"]:
-                query = query.filter(Check.type == payment_type)
+        direction = CursorDirection.NEXT
 
-            if greater_than_date := filters["greater_than_date"]:
-                query = query.filter(Check.created_at == greater_than_date)
+        if page:
+            query = query.offset((page - 1) * size)
+        elif cursor:
+            cursor_key, direction = self._decode_check_cursor(cursor, ranked=bool(search))
+            if direction == CursorDirection.NEXT:
+                query = query.where(tuple_(*order_columns) < tuple_(*cursor_key))
+            else:
+                query = query.where(tuple_(*order_columns) > tuple_(*cursor_key))
 
-        result = (await self._db.execute(query)).unique().all()
+        if direction == CursorDirection.NEXT:
+            query = query.order_by(*[column.desc() for column in order_columns])
+        else:
+            query = query.order_by(*[column.asc() for column in order_columns])
+
+        # one extra row tells whether there is anything beyond the page
+        result = (await self._db.execute(query.limit(size + 1))).all()
+        has_more = len(result) > size
+        result = result[:size]
+
+        if direction == CursorDirection.PREVIOUS:
+            result.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor) or bool(page and page > 1)
 
         checks_out = []
+        for check, check_creator, *_ in result:
+            checks_out.append(self._convert_base_query_result_to_check_schema(check, check_creator=check_creator))
+
+        def page_cursor(index: int, cursor_direction: CursorDirection) -> str:
+            rank = result[index].rank if search else None
+            return self._encode_check_cursor(checks_out[index], cursor_direction, rank=rank)
+
+        return CursorPage[CheckOut](
+            items=checks_out,
+            size=size,
+            page=page,
+            next_cursor=page_cursor(-1, CursorDirection.NEXT) if checks_out and has_next else None,
+            previous_cursor=page_cursor(0, CursorDirection.PREVIOUS) if checks_out and has_previous else None,
+        )
 
-        for check, total_sum, payment_rest, check_creator in result:
-            checks_out.append(
-                self._convert_base_query_result_to_check_schema(check, total_sum, payment_rest, check_creator=check_creator)
+    @staticmethod
+    def _product_name_matches_query(customer_id: int, search: str) -> Subquery:
+        """
+        Builds the subquery of customer's checks having a product whose name contains the search text.
+
+        The case insensitive substring match is served by the trigram GIN index on productcheck.name,
+        checks are ranked by the best word similarity of their products to the search text.
+
+        :param customer_id: The unique identifier of a user who created checks
+        :param search: The text to search in names of products
+
+        :returns: The subquery with check_id, created_at and rank columns.
+        """
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return (
+            select(
+                ProductCheck.check_id,
+                ProductCheck.created_at,
+                func.max(func.word_similarity(search, ProductCheck.name)).label("rank"),
             )
-        return checks_out
+            .join(Check, and_(Check.check_id == ProductCheck.check_id, Check.created_at == ProductCheck.created_at))
+            .where(Check.customer_id == customer_id, ProductCheck.name.ilike(pattern, escape="\\"))
+            .group_by(ProductCheck.check_id, ProductCheck.created_at)
+            .subquery()
+        )
+
+    async def stream_user_checks(
+            self,
+            customer_id: int,
+            filters: Optional[Dict[Any, Any]],
+            batch_size: int,
+    ) -> AsyncIterator[CheckOut]:
+        """
+        Streams all checks created by user with id customer_id, the oldest first.
+
+        Rows are read through a server side cursor batch_size rows at a time,
+        so memory does not depend on the number of checks.
+
+        :param customer_id: The unique identifier of a user who created checks
+        :param filters: Dictionary of filters to apply.
+        :param batch_size: The number of checks fetched from the cursor at once
+
+        :returns: Async iterator over checks.
+        """
+        base_query = BASE_CHECK_GET_LIST_QUERY.options(*CHECK_LOAD_OPTIONS[CheckLoadProfile.DETAILED])
+        query = (
+            self._filter_checks_query(base_query.where(Check.customer_id == customer_id), filters)
+            .order_by(Check.created_at.asc(), Check.check_id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self._db.stream(query)
+        try:
+            async for partition in result.partitions():
+                for check, check_creator in partition:
+                    yield self._convert_base_query_result_to_check_schema(check, check_creator=check_creator)
+        finally:
+            await result.close()
+
+    @staticmethod
+    def _filter_checks_query(query: Select, filters: Optional[Dict[Any, Any]]) -> Select:
+        """
+        Applies the listing filters to a checks query.
+
+        :param query: The query selecting checks
+        :param filters: Dictionary of filters to apply.
+
+        :returns: The filtered query.
+        """
+        if filters:
+            if total_sum := filters.get("total_sum"):
+                query = query.where(Check.total > total_sum)
+
+            if payment_type := filters.get("payment_type"):
+                query = query.filter(Check.type == payment_type)
+
+            # plain ranges on created_at, so the (customer_id, created_at) index serves them
+            if date_from := filters.get("date_from"):
+                query = query.where(Check.created_at >= to_naive_utc(date_from))
+
+            if date_to := filters.get("date_to"):
+                query = query.where(Check.created_at < to_naive_utc(date_to))
+
+            if greater_than_date := filters.get("greater_than_date"):
+                # deprecated, checks created after the given day
+                next_day = datetime.combine(greater_than_date + timedelta(days=1), time.min)
+                query = query.where(Check.created_at >= next_day)
+
+        return query
+
+    @staticmethod
+    def _encode_check_cursor(check: CheckOut, direction: CursorDirection, rank: Optional[float] = None) -> str:
+        data = {"created_at": check.created_at.isoformat(), "check_id": check.check_id, "direction": direction.value}
+        if rank is not None:
+            data["rank"] = rank
+        return encode_cursor(data)
+
+    @staticmethod
+    def _decode_check_cursor(cursor: str, ranked: bool = False) -> Tuple[Tuple[Any, ...], CursorDirection]:
+        """
+        Decodes the cursor into the values of the ordering columns and the direction.
+
+        :param cursor: The opaque cursor
+        :param ranked: Whether the listing is ordered by search rank first
+
+        :returns: The ordering key of the cursor row and the direction.
+        """
+        try:
+            data = decode_cursor(cursor)
+            key = (datetime.fromisoformat(data["created_at"]), int(data["check_id"]))
+            if ranked:
+                key = (float(data["rank"]), *key)
+            return key, CursorDirection.from_str(data["direction"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor")
 
     async def get_with_collected_details(
             self,
             customer_id: Optional[int] = None,
             check_id: Optional[int] = None,
-            check_token: Optional[str] = None
+            check_token: Optional[UUID] = None
     ) -> Union[CheckOut, None]:
         """
         The method allow to get a check by unique identifiers like check_token or check_id.
@@ -82,45 +312,56 @@ class DBCheckOps(DBConnectorBase[Check, CheckOrderInput, UpdateCheck]):
         :returns: The pydantic model instance or None.
         """
 
-        count_query = COUNT_TOTAL_AND_REST_QUERY.where(Check.customer_id == customer_id) if customer_id else COUNT_TOTAL_AND_REST_QUERY
-        query = BASE_CHECK_GET_QUERY.where(Check.customer_id == customer_id) if customer_id else BASE_CHECK_GET_QUERY
+        query = BASE_CHECK_GET_QUERY.options(*CHECK_LOAD_OPTIONS[CheckLoadProfile.DETAILED])
+        if customer_id:
+            query = query.where(Check.customer_id == customer_id)
 
         if check_id:
             query = query.where(Check.check_id == check_id)
-            count_query = count_query.where(Check.check_id == check_id)
         elif check_token:
-            query = query.where(Check.token == check_token)
-            count_query = count_query.where(Check.token == check_token)
+            query = where_check_token(query, check_token)
         else:
             return
 
-        count_result = (await self._db.execute(count_query)).unique().one_or_none()
+        result = (await self._db.execute(query)).one_or_none()
+        if result:
+            check, check_creator = result
+            return self._convert_base_query_result_to_check_schema(check=check, check_creator=check_creator)
 
-        if count_result:
-            result = (await self._db.execute(query)).unique().one_or_none()
-            return self._convert_base_query_result_to_check_schema(
-                check=result[0],
-                check_creator=result[1],
-                total_check_sum=count_result[1],
-                payment_rest=count_result[2]
-            )
+        # old checks are moved to the archive, they stay public by the token
+        if check_token and not customer_id and (archived := await self._get_archived_check(check_token)):
+            return archived
+
+        if replica_router.reads_from_replica(self._db):
+            # the check could be created or archived a moment ago and not be replicated yet
+            async with replica_router.primary_read_session() as primary_session:
+                return await DBCheckOps(primary_session).get_with_collected_details(customer_id, check_id, check_token)
 
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=f"The object with primary key {check_id} could not be found.")
+                            detail=f"The object with primary key {check_id or check_token.hex} could not be found.")
+
+    async def _get_archived_check(self, check_token: UUID) -> Optional[CheckOut]:
+        """
+        Get the archived check by its token, the slower path of checks no longer stored in the check table.
+
+        :param check_token: The unique token of the check
+
+        :returns: The pydantic model instance or None.
+        """
+        payload = (
+            await self._db.execute(select(CheckArchive.payload).where(CheckArchive.token == check_token))
+        ).scalar_one_or_none()
+        return CheckOut.model_validate_json(zlib.decompress(payload)) if payload is not None else None
 
     @staticmethod
     def _convert_base_query_result_to_check_schema(
             check: Check,
-            total_check_sum: float,
-            payment_rest: float,
             check_creator: Optional[str] = None,
     ) -> CheckOut:
         """
         The method performs the conversion of the base query results into a CheckOut schema.
 
-        check: An object of the Check class representing the check.
-        total_check_sum: The total sum of the check is counted by products and their prices.
-        payment_rest: The rest after payment.
+        check: An object of the Check class representing the check with its stored total and rest.
         check_creator (optional): The name of the check creator.
 
         Returns:
@@ -134,9 +375,8 @@ class DBCheckOps(DBConnectorBase[Check, CheckOrderInput, UpdateCheck]):
             check_id=check.check_id,
             created_at=check.created_at,
             token=check.token,
-            url=check.url,
-            total=total_check_sum,
-            rest=payment_rest,
+            total=check.total,
+            rest=check.rest,
             customer_name=check_creator if check_creator else f"{check.customer.first_name}" + f"{check.customer.last_name}"
         )
         return check_out
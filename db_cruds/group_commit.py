@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+from datetime import datetime
+from typing import Any, AsyncContextManager, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.session import database_error_to_http_exception
+from db_cruds.check import DBCheckOps
+
+
+class PendingCheck(NamedTuple):
+    check_values: Dict[str, Any]
+    products: List[Dict[str, Any]]
+    future: "asyncio.Future[Tuple[int, datetime]]"
+
+
+class CheckGroupCommitter:
+    """
+    Coalesces checks created by concurrent requests into multi-row inserts committed by one transaction,
+    so a burst of requests pays for one BEGIN/COMMIT and fsync instead of one per check.
+
+    A check waits at most the window for others to join it, a batch reaching the max size is committed
+    at once. When the multi-row insert fails, checks of the batch are inserted one by one in savepoints
+    of the same transaction, so every caller gets its own result or error.
+    """
+
+    def __init__(
+            self,
+            session_factory: Callable[[], AsyncContextManager[AsyncSession]],
+            window: float,
+            max_size: int,
+    ):
+        self._session_factory = session_factory
+        self._window = window
+        self._max_size = max_size
+        self._pending: List[PendingCheck] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._commits: Set[asyncio.Task] = set()
+
+    async def create(self, check_values: Dict[str, Any], products: List[Dict[str, Any]]) -> Tuple[int, datetime]:
+        """
+        Insert the check with its products together with checks of concurrent callers.
+
+        :param check_values: The column values of the check
+        :param products: The column values of products of the check
+        :raises: the error of the check or of the commit of its batch
+
+        :returns: The check_id and created_at of the committed check.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(PendingCheck(check_values, products, future))
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+        return await future
+
+    async def shutdown(self) -> None:
+        """
+        Commit the waiting checks and wait for the running commits
+        """
+        self._flush()
+        if self._commits:
+            await asyncio.gather(*self._commits, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # the commit is not a part of the request which happened to fill the batch, its statements
+            # are not counted by the SQL instrumentation of the request
+            task = contextvars.Context().run(asyncio.create_task, self._commit(batch))
+            self._commits.add(task)
+            task.add_done_callback(self._commits.discard)
+
+    async def _commit(self, batch: List[PendingCheck]) -> None:
+        results: List[Union[Tuple[int, datetime], Exception]]
+        try:
+            async with self._session_factory() as session:
+                results = await self._insert(session, batch)
+        except Exception as e:
+            # nothing of the batch is committed
+            results = [e] * len(batch)
+
+        for pending, result in zip(batch, results):
+            if pending.future.done():
+                # the caller is gone, e.g. the client disconnected
+                continue
+            if isinstance(result, Exception):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    @staticmethod
+    async def _insert(
+            session: AsyncSession,
+            batch: List[PendingCheck],
+    ) -> List[Union[Tuple[int, datetime], Exception]]:
+        check_ops = DBCheckOps(session)
+        try:
+            async with session.begin_nested():
+                return list(await check_ops.create_checks_bulk(
+                    [pending.check_values for pending in batch], [pending.products for pending in batch]
+                ))
+        except DBAPIError:
+            if len(batch) == 1:
+                raise
+
+        results: List[Union[Tuple[int, datetime], Exception]] = []
+        for pending in batch:
+            try:
+                async with session.begin_nested():
+                    results.extend(await check_ops.create_checks_bulk([pending.check_values], [pending.products]))
+            except DBAPIError as e:
+                # the error of the check is not raised through the transaction, it is answered the same way
+                results.append(database_error_to_http_exception(e))
+        return results
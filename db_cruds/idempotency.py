@@ -0,0 +1,87 @@
+from datetime import timedelta
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from db_cruds.base import DBConnectorBase
+from models.all_models import IdempotencyKey
+
+
+class DBIdempotencyKeyOps(DBConnectorBase[IdempotencyKey, BaseModel, BaseModel]):
+    """IdempotencyKey class to store and replay responses of retried requests"""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, IdempotencyKey)
+
+    async def claim(self, customer_id: int, key: str, fingerprint: bytes) -> Optional[IdempotencyKey]:
+        """
+        Claim the key for the request processed in the current transaction.
+
+        The key row is inserted in the transaction of the request, so a concurrent request with
+        the same key waits on the primary key until the transaction ends. It then gets the stored
+        response when the transaction committed or claims the key itself when it rolled back.
+        An expired key is claimed again.
+
+        :param customer_id: The unique identifier of a user who sends the request
+        :param key: The value of the Idempotency-Key header
+        :param fingerprint: The digest of the request payload
+
+        :returns: None when the key is claimed, otherwise the key of a completed request.
+        """
+        expires_at = func.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_IN_SECONDS)
+        statement = insert(IdempotencyKey).values(
+            customer_id=customer_id, key=key, fingerprint=fingerprint, expires_at=expires_at
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.customer_id, IdempotencyKey.key],
+            set_=dict(
+                fingerprint=statement.excluded.fingerprint,
+                expires_at=statement.excluded.expires_at,
+                status_code=None,
+                response_body=None,
+            ),
+            where=IdempotencyKey.expires_at <= func.now(),
+        ).returning(IdempotencyKey.key)
+
+        if (await self._db.execute(statement)).scalar() is not None:
+            return None
+
+        query = select(IdempotencyKey).where(IdempotencyKey.customer_id == customer_id, IdempotencyKey.key == key)
+        return (await self._db.execute(query)).scalar_one()
+
+    async def save_response(self, customer_id: int, key: str, status_code: int, body: bytes) -> None:
+        """
+        Store the response of the request which claimed the key.
+
+        :param customer_id: The unique identifier of a user who sent the request
+        :param key: The claimed key
+        :param status_code: The status code of the response
+        :param body: The rendered body of the response
+        """
+        await self._db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.customer_id == customer_id, IdempotencyKey.key == key)
+            .values(status_code=status_code, response_body=body)
+        )
+
+    async def delete_expired(self, batch_size: int) -> int:
+        """
+        Delete a batch of expired keys.
+
+        :param batch_size: The maximal count of keys to delete
+
+        :returns: The count of deleted keys.
+        """
+        expired = (
+            select(IdempotencyKey.customer_id, IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at <= func.now())
+            .limit(batch_size)
+        )
+        result = await self._db.execute(
+            delete(IdempotencyKey).where(tuple_(IdempotencyKey.customer_id, IdempotencyKey.key).in_(expired))
+        )
+        return result.rowcount
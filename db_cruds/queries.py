@@ -1,38 +1,43 @@
-from sqlalchemy import select, func
-from sqlalchemy.orm import joinedload
-
-from models.all_models import Check, ProductCheck, User
-
-COUNT_TOTAL_AND_REST_QUERY = (
-    select(Check,
-           func.sum(ProductCheck.price * ProductCheck.quantity).label("total"),
-           Check.amount - func.sum(ProductCheck.price * ProductCheck.quantity).label("rest"),
-           )
-    .join(ProductCheck)
-    .group_by(Check.check_id)
-)
+from typing import Dict, Tuple
+from uuid import UUID
+
+from sqlalchemy import Select, and_, select, func
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.interfaces import ORMOption
+
+from core.enums import CheckLoadProfile
+from models.all_models import Check, CheckToken, User
+
+# Loader options of every profile, the mapped relationships of Check raise when accessed without being loaded.
+# Products are fetched by a single selectin query for all returned checks.
+CHECK_LOAD_OPTIONS: Dict[CheckLoadProfile, Tuple[ORMOption, ...]] = {
+    CheckLoadProfile.SUMMARY: (),
+    CheckLoadProfile.DETAILED: (selectinload(Check.details),),
+    CheckLoadProfile.FULL: (selectinload(Check.details), joinedload(Check.customer)),
+}
 
+# One row per check: the check itself with its stored total and rest and the customer name.
 BASE_CHECK_GET_QUERY = (
     select(
         Check,
         func.concat(User.first_name, " ", User.last_name).label("full_customer_name")
     )
-    .join(ProductCheck, ProductCheck.check_id == Check.check_id)
     .join(User, User.user_id == Check.customer_id)
-    .options(joinedload(Check.details))
-    .options(joinedload(Check.customer))
-
 )
 
-BASE_CHECK_GET_LIST_QUERY = (
-    select(
-        Check,
-        func.sum(ProductCheck.price * ProductCheck.quantity).label("total"),
-        (Check.amount - func.sum(ProductCheck.price * ProductCheck.quantity)).label("rest"),
-        func.concat(User.first_name, " ", User.last_name).label("full_customer_name")
+BASE_CHECK_GET_LIST_QUERY = BASE_CHECK_GET_QUERY
+
+
+def where_check_token(query: Select, token: UUID) -> Select:
+    """
+    Filter the check query by the token of the check. The token is found by the primary key of checktoken,
+    its created_at prunes the monthly partitions of checks to the one of the check when the query runs.
+
+    :param query: query selecting Check
+    :param token: the token of the check
+    :return: the filtered query
+    """
+    return (
+        query.join(CheckToken, and_(CheckToken.check_id == Check.check_id, CheckToken.created_at == Check.created_at))
+        .where(CheckToken.token == token)
     )
-    .join(ProductCheck, ProductCheck.check_id == Check.check_id)
-    .join(User, User.user_id == Check.customer_id)
-    .options(joinedload(Check.details))
-    .group_by(Check.check_id, User.first_name, User.last_name)
-)
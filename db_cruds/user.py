@@ -1,12 +1,29 @@
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Union
 
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.cache import principal_cache
 from db_cruds.base import DBConnectorBase
 from models.all_models import User
 
 from schemas.user import UserCreateForDB, UserUpdate
 
+# session.info key of users whose cached principals are dropped once more when the session commits
+_CHANGED_PRINCIPALS = "changed_principals"
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_committed_principals(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_PRINCIPALS, ()):
+        principal_cache.pop(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_principals(session: Session) -> None:
+    session.info.pop(_CHANGED_PRINCIPALS, None)
+
 
 class DBUserOps(DBConnectorBase[User, UserCreateForDB, UserUpdate]):
     """User crud"""
@@ -26,3 +43,48 @@ class DBUserOps(DBConnectorBase[User, UserCreateForDB, UserUpdate]):
             .where(self.model.email == user_email)
         )
         return result.scalars().first()
+
+    async def update(self, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]) -> User:
+        """
+        Update user and drop the cached principal of the user
+
+        :param db_obj: user model instance that is updated
+        :param obj_in: blueprint object
+        :return: updated user model instance
+        """
+        user = await super().update(db_obj, obj_in)
+        self._drop_principals([user.user_id])
+        return user
+
+    async def drop(self, object_pk: int):
+        """
+        Remove user and drop the cached principal of the user
+
+        :param object_pk: primary key of user that is deleted
+        """
+        await super().drop(object_pk)
+        self._drop_principals([object_pk])
+
+    async def drop_many(self, object_ids: List[int], batch_size: Optional[int] = None):
+        """
+        Remove users and drop the cached principals of the users
+
+        :param object_ids: primary keys of users that are deleted
+        :param batch_size: the count of users deleted by one statement
+        """
+        await super().drop_many(object_ids, batch_size)
+        self._drop_principals(object_ids)
+
+    def _drop_principals(self, user_ids: Iterable[int]) -> None:
+        """
+        Drop the cached principals of changed users now and again after the transaction commits.
+
+        Until the commit other requests still read the old rows, a principal they cache in the meantime
+        is dropped by the second pass.
+
+        :param user_ids: primary keys of the changed users
+        """
+        user_ids = list(user_ids)
+        for user_id in user_ids:
+            principal_cache.pop(user_id)
+        self._db.info.setdefault(_CHANGED_PRINCIPALS, set()).update(user_ids)
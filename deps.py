@@ -1,13 +1,18 @@
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncGenerator, Callable, Optional
 
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.config import settings
 from security.auth_connector import AuthConnector
-
+from security.password_hasher import PasswordHasher, password_hasher
 from security.token_handler import TokenHandler
-from core.session import async_session, run_transaction
+from core.session import async_read_only_transaction_session, async_read_session, async_session, \
+    replica_router, run_transaction
 from db_cruds.check import DBCheckOps
+from db_cruds.group_commit import CheckGroupCommitter
+from db_cruds.idempotency import DBIdempotencyKeyOps
 from db_cruds.product import DBProductCheckOps
 from db_cruds.user import DBUserOps
 
@@ -18,6 +23,37 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             yield session
 
 
+def get_session_factory() -> Callable[[], AsyncContextManager[AsyncSession]]:
+    """
+    Sessions for work which outlives the request dependencies, like streamed responses
+    """
+    return asynccontextmanager(get_session)
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sessions of endpoints which only read, statements run on a replica in autocommit mode without a transaction
+    """
+    async with async_read_session(bind=replica_router.get_read_engine()) as session:
+        async with replica_router.track_health(session):
+            yield session
+
+
+async def _get_read_only_transaction_session() -> AsyncGenerator[AsyncSession, None]:
+    bind = replica_router.get_read_only_transaction_engine()
+    async with async_read_only_transaction_session(bind=bind) as session:
+        async with replica_router.track_health(session), session.begin():
+            yield session
+
+
+def get_read_session_factory() -> Callable[[], AsyncContextManager[AsyncSession]]:
+    """
+    Read only sessions for streamed responses, they run in a READ ONLY transaction as
+    server-side cursors can not live outside of a transaction
+    """
+    return asynccontextmanager(_get_read_only_transaction_session)
+
+
 def get_user_crud(session: AsyncSession = Depends(get_session)) -> DBUserOps:
     return DBUserOps(session)
 
@@ -26,6 +62,32 @@ def get_check_crud(session: AsyncSession = Depends(get_session)) -> DBCheckOps:
     return DBCheckOps(session)
 
 
+def get_read_user_crud(session: AsyncSession = Depends(get_read_session)) -> DBUserOps:
+    return DBUserOps(session)
+
+
+def get_read_check_crud(session: AsyncSession = Depends(get_read_session)) -> DBCheckOps:
+    return DBCheckOps(session)
+
+
+def get_idempotency_key_crud(session: AsyncSession = Depends(get_session)) -> DBIdempotencyKeyOps:
+    return DBIdempotencyKeyOps(session)
+
+
+check_group_committer = CheckGroupCommitter(
+    get_session_factory(),
+    window=settings.CHECK_GROUP_COMMIT_WINDOW_IN_MILLISECONDS / 1000,
+    max_size=settings.CHECK_GROUP_COMMIT_MAX_SIZE,
+)
+
+
+def get_check_group_committer() -> Optional[CheckGroupCommitter]:
+    """
+    The committer of new checks when group commit is enabled, otherwise every request commits its own check
+    """
+    return check_group_committer if settings.CHECK_GROUP_COMMIT_ENABLED else None
+
+
 def get_product_check_crud(session: AsyncSession = Depends(get_session)) -> DBProductCheckOps:
     return DBProductCheckOps(session)
 
@@ -34,10 +96,15 @@ def get_token_handler() -> TokenHandler:
     return TokenHandler()
 
 
+def get_password_hasher() -> PasswordHasher:
+    return password_hasher
+
+
 def get_auth_connector(
     crud: DBUserOps = Depends(get_user_crud),
     token_handler: TokenHandler = Depends(get_token_handler),
+    hasher: PasswordHasher = Depends(get_password_hasher),
 ) -> AuthConnector:
-    return AuthConnector(crud, token_handler)
+    return AuthConnector(crud, token_handler, hasher)
 
 
@@ -1,16 +1,37 @@
 from fastapi import FastAPI
-from fastapi_pagination import add_pagination
 from starlette.staticfiles import StaticFiles
 
+from api import metrics
 from api.routers import api_router
 
+from core.cache import principal_cache, public_check_cache, token_payload_cache
 from core.config import settings
+from core.instrumentation import SQLInstrumentationMiddleware, install_sql_instrumentation
+from core.metrics import MetricsMiddleware, register_cache, register_pool
+from core.session import engine, replica_router
+from deps import check_group_committer
+from security.password_hasher import password_hasher
 
 app = FastAPI(
     title="payment application",
 )
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.add_event_handler("shutdown", password_hasher.shutdown)
+app.add_event_handler("shutdown", check_group_committer.shutdown)
+
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    for instrumented_engine in [engine, *replica_router.replicas]:
+        install_sql_instrumentation(instrumented_engine.sync_engine)
+    app.add_middleware(SQLInstrumentationMiddleware)
 
-add_pagination(app)
+app.add_middleware(MetricsMiddleware)
+register_pool("primary", engine.pool)
+for replica_index, replica in enumerate(replica_router.replicas):
+    register_pool(f"replica-{replica_index}", replica.pool)
+register_cache("public_check", public_check_cache)
+register_cache("principal", principal_cache)
+register_cache("token_payload", token_payload_cache)
+
+app.mount("/static", StaticFiles(directory="static"), name="static")
 
 app.include_router(api_router, prefix=settings.API_PREFIX)
+app.include_router(metrics.router)
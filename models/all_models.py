@@ -1,14 +1,25 @@
 from datetime import datetime
+from decimal import Decimal
 from typing import List
+from uuid import UUID
 
-from sqlalchemy import Integer, Float, String, ForeignKey, func
+from sqlalchemy import (
+    Integer, Numeric, String, ForeignKey, ForeignKeyConstraint, Index, LargeBinary, SmallInteger,
+    func,
+)
 from sqlalchemy.orm import mapped_column, Mapped, relationship
-from sqlalchemy.dialects.postgresql import ENUM
+from sqlalchemy.dialects.postgresql import ENUM, UUID as PG_UUID
 
 
 from core.enums import PaymentType
 from models.base import BaseClass
 
+# money is exact, 10 digits before the decimal point and cents
+MONEY = Numeric(12, 2)
+
+# timestamps are stored without time zone as UTC, now() alone would store the time of the TimeZone of the session
+UTC_NOW = func.timezone("UTC", func.now())
+
 
 class User(BaseClass):
 
@@ -22,45 +33,134 @@ class User(BaseClass):
 
     hashed_password: Mapped[str] = mapped_column(String(256), nullable=False)
 
-    create_date: Mapped[datetime] = mapped_column(insert_default=func.now())
+    create_date: Mapped[datetime] = mapped_column(insert_default=UTC_NOW)
 
-    checks: Mapped[List["Check"]] = relationship(back_populates="customer", lazy="noload")
+    checks: Mapped[List["Check"]] = relationship(back_populates="customer", lazy="raise")
 
 
 class Check(BaseClass):
+    __table_args__ = (
+        # serves listing of customer's checks ordered and filtered by creation date
+        Index("ix_check_customer_id_created_at", "customer_id", "created_at", "check_id"),
+        # monthly partitions are created by scripts/manage_partitions.py, see db/partitioning.py
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     check_id = mapped_column(Integer, primary_key=True, autoincrement=True)
 
-    token = mapped_column(String(50), nullable=False, unique=True)
-
-    url = mapped_column(String(256), nullable=False)
+    # the public url of the check is built from the token when the check is sent, tokens are unique
+    # and found by CheckToken, unique keys of a partitioned table would have to contain created_at
+    token: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False)
 
     type: Mapped[str] = mapped_column(ENUM(PaymentType, name=PaymentType.get_name()), nullable=False)
 
-    amount: Mapped[float] = mapped_column(Float, nullable=False) # given many
+    amount: Mapped[Decimal] = mapped_column(MONEY, nullable=False) # given many
+
+    total: Mapped[Decimal] = mapped_column(MONEY, nullable=False)  # sum of products cost
+
+    rest: Mapped[Decimal] = mapped_column(MONEY, nullable=False)  # amount minus total
 
-    created_at: Mapped[datetime] = mapped_column(insert_default=func.now())
+    # part of the primary key as the partition key
+    created_at: Mapped[datetime] = mapped_column(primary_key=True, insert_default=UTC_NOW)
 
-    details: Mapped[List["ProductCheck"]] = relationship(back_populates="check", lazy="joined")
+    # relationships are loaded only when a query asks for them, see CHECK_LOAD_OPTIONS in db_cruds/queries.py,
+    # accessing one which was not loaded raises instead of emitting a lazy query
+    details: Mapped[List["ProductCheck"]] = relationship(back_populates="check", lazy="raise")
 
     customer_id = mapped_column(ForeignKey("user.user_id"), nullable=False)
-    customer: Mapped["User"] = relationship(back_populates="checks", lazy="joined")
+    customer: Mapped["User"] = relationship(back_populates="checks", lazy="raise")
 
     def __repr__(self):
         return f"<Check(id={self.check_id}, customer_id={self.customer_id}, total_amount={self.amount})>"
 
 
 class ProductCheck(BaseClass):
+    __table_args__ = (
+        # serves case insensitive substring search of product names, needs the pg_trgm extension
+        Index(
+            "ix_productcheck_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+        # moving a check to another month moves its line items along
+        ForeignKeyConstraint(["check_id", "created_at"], ["check.check_id", "check.created_at"], onupdate="CASCADE"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     check_detail_id = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     name: Mapped[str] = mapped_column(String(100), nullable=False)
 
-    check_id = mapped_column(ForeignKey("check.check_id"), nullable=False)
-    check: Mapped["Check"] = relationship(back_populates="details", lazy="noload")
+    check_id = mapped_column(Integer, nullable=False, index=True)
+    check: Mapped["Check"] = relationship(back_populates="details", lazy="raise")
+
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    price: Mapped[Decimal] = mapped_column(MONEY, nullable=False)
+
+    # created_at of the check, line items are stored in the partition of their check
+    created_at: Mapped[datetime] = mapped_column(primary_key=True)
+
+    def __repr__(self):
+        return f"<CheckDetail(check_detail_id={self.check_detail_id}, check_id={self.check_id}, quantity={self.quantity})>"
+
+
+class IdempotencyKey(BaseClass):
+    """Response of a request sent with the Idempotency-Key header, replayed to retries of the request"""
+    __table_args__ = (
+        # serves purging of expired keys
+        Index("ix_idempotencykey_expires_at", "expires_at"),
+    )
+
+    customer_id = mapped_column(ForeignKey("user.user_id", ondelete="CASCADE"), primary_key=True)
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    # sha256 digest of the request payload, a key reused with another payload is rejected
+    fingerprint: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False)
+
+    status_code: Mapped[int] = mapped_column(SmallInteger, nullable=True)
+
+    response_body: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+
+    expires_at: Mapped[datetime] = mapped_column(nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(customer_id={self.customer_id}, key={self.key}, status_code={self.status_code})>"
+
+
+class CheckToken(BaseClass):
+    """Token of a check with its primary key, public pages find the check without probing every monthly partition"""
+    __table_args__ = (
+        # archived or deleted checks take their tokens along, moving a check to another month moves its token too
+        ForeignKeyConstraint(
+            ["check_id", "created_at"], ["check.check_id", "check.created_at"], ondelete="CASCADE", onupdate="CASCADE"
+        ),
+    )
+
+    token: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True)
+
+    check_id = mapped_column(Integer, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(nullable=False)
+
+    def __repr__(self):
+        return f"<CheckToken(token={self.token}, check_id={self.check_id})>"
+
+
+class CheckArchive(BaseClass):
+    """Check moved out of the check and productcheck tables by scripts/archive_checks.py"""
+
+    check_id = mapped_column(Integer, primary_key=True, autoincrement=False)
+
+    # archived checks stay public, the public page falls back to the archive when the token is not found
+    token: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False, unique=True)
+
+    customer_id = mapped_column(ForeignKey("user.user_id"), nullable=False, index=True)
+
+    created_at: Mapped[datetime] = mapped_column(nullable=False)
+
+    archived_at: Mapped[datetime] = mapped_column(nullable=False, insert_default=UTC_NOW)
 
-    quantity: Mapped[float] = mapped_column(Float, nullable=False)
-    price: Mapped[float] = mapped_column(Float, nullable=False)
+    # zlib compressed JSON of the check with its products as sent by the API, without the url
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
 
     def __repr__(self):
-        return f"<CheckDetail(check_detail_id={self.check_detail_id}, check_id={self.check_id}, quantity={self.quantity})>"
\ No newline at end of file
+        return f"<CheckArchive(check_id={self.check_id}, customer_id={self.customer_id})>"
@@ -5,13 +5,14 @@ from annotated_types import Len
 from pydantic import BaseModel, ConfigDict, conlist
 
 from core.enums import PaymentType
+from schemas.fields import CheckToken, Money
 from schemas.product import Product
 
 
 class Payment(BaseModel):
 
     type: PaymentType
-    amount: float
+    amount: Money
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -30,17 +31,21 @@ class CheckOut(CheckOrderInput):
 
     check_id: int
     created_at: datetime
-    token: str
-    url: str
-    total: float
-    rest: float
+    token: CheckToken
+    # not stored, built from the token by the API when the check is sent
+    url: Optional[str] = None
+    total: Money
+    rest: Money
     customer_name: Optional[str] = None
 
 
+class CheckBatchItemOut(BaseModel):
 
+    index: int
+    check: Optional[CheckOut] = None
+    error: Optional[str] = None
 
 
+class CheckBatchOut(BaseModel):
 
-
-
-
+    items: List[CheckBatchItemOut]
@@ -0,0 +1,19 @@
+from decimal import Decimal
+from typing import Annotated
+from uuid import UUID
+
+from pydantic import AfterValidator, Field, PlainSerializer
+
+CENTS = Decimal("0.01")
+
+# amounts are stored as NUMERIC(12, 2) and always carry cents, also the ones computed before they are stored,
+# JSON keeps sending them as numbers
+Money = Annotated[
+    Decimal,
+    Field(max_digits=12, decimal_places=2),
+    AfterValidator(lambda amount: amount.quantize(CENTS)),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+
+# check tokens are stored as UUID, clients get them in the 32 hex digits form
+CheckToken = Annotated[UUID, PlainSerializer(lambda token: token.hex, return_type=str)]
@@ -0,0 +1,14 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel
+
+ItemType = TypeVar("ItemType")
+
+
+class CursorPage(BaseModel, Generic[ItemType]):
+
+    items: List[ItemType]
+    size: int
+    page: Optional[int] = None
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
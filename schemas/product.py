@@ -1,8 +1,10 @@
 from pydantic import BaseModel, ConfigDict
 
+from schemas.fields import Money
+
 
 class Product(BaseModel):
     name: str
-    price: float
+    price: Money
     quantity: int
     model_config = ConfigDict(from_attributes=True)
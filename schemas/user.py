@@ -13,6 +13,15 @@ class UserBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserPrincipal(BaseModel):
+    """The authenticated user resolved from an access token"""
+
+    user_id: int
+    first_name: str
+    last_name: str
+    model_config = ConfigDict(from_attributes=True)
+
+
 class UserLoginQuery(BaseModel):
 
     user_email: str
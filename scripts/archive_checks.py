@@ -0,0 +1,68 @@
+"""
+Move checks older than the given age with their products to the checkarchive table, run it
+periodically (e.g. daily from cron). Every batch is archived in its own short transaction with
+a pause between batches, so an interrupted run is resumed by running it again. Archived checks
+stay public by their token. Monthly partitions emptied by the archiving can be detached by
+scripts/manage_partitions.py.
+
+Usage:
+    python -m scripts.archive_checks --older-than-days 365 --batch-size 500 --pause 0.5
+    python -m scripts.archive_checks --max-batches 10
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from core.config import settings
+from core.session import async_session, engine
+from db_cruds.archive import DBCheckArchiveOps
+from utils import to_naive_utc, utcnow
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Archive checks batch by batch and log the progress
+    """
+    cutoff = to_naive_utc(utcnow()) - timedelta(days=args.older_than_days)
+    async with async_session() as db:
+        total = await DBCheckArchiveOps(db).count_archivable(cutoff)
+    logger.info(f"{total} checks created before {cutoff:%Y-%m-%d %H:%M:%S} to archive")
+
+    archived = batches = 0
+    started = time.monotonic()
+    while not args.max_batches or batches < args.max_batches:
+        async with async_session() as db:
+            async with db.begin():
+                batch = await DBCheckArchiveOps(db).archive_batch(cutoff, args.batch_size)
+        if not batch:
+            break
+        archived += batch
+        batches += 1
+
+        rate = archived / (time.monotonic() - started)
+        left = max(total - archived, 0)
+        logger.info(f"archived {archived}/{total} checks, {rate:.0f} checks/s, {left / rate:.0f} s left")
+        await asyncio.sleep(args.pause)
+
+    logger.info(f"archived {archived} checks in {batches} batches")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, default=settings.CHECK_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.CHECK_ARCHIVE_BATCH_SIZE)
+    parser.add_argument(
+        "--pause",
+        type=float,
+        default=settings.CHECK_ARCHIVE_PAUSE_IN_SECONDS,
+        help="seconds between batches, leaves room for the requests",
+    )
+    parser.add_argument("--max-batches", type=int, default=0, help="stop after this number of batches, 0 runs all")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,111 @@
+"""
+Create monthly partitions of check and productcheck ahead of time and detach old ones, run it
+periodically (e.g. daily from cron). Detached partitions stay in the database as plain tables
+to be archived or dropped.
+
+Usage:
+    python -m scripts.manage_partitions --months-ahead 3 --retention-months 24
+    python -m scripts.manage_partitions --dry-run
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.config import settings
+from core.session import engine
+from db.partitioning import (
+    PARTITIONED_TABLES,
+    add_months,
+    count_default_partition_rows,
+    create_partition_sql,
+    delete_check_tokens_sql,
+    detach_partition_sql,
+    get_partitions,
+    month_start,
+)
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# DDL waits for locks held by running queries, new queries queue behind it, so it gives up quickly
+LOCK_TIMEOUT = "5s"
+
+
+async def run_ddl(connection: AsyncConnection, statement: str, dry_run: bool) -> None:
+    logger.info(statement)
+    if dry_run:
+        return
+    # every statement runs in its own short transaction
+    await connection.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    await connection.execute(text(statement))
+    await connection.commit()
+
+
+async def drop_foreign_keys(connection: AsyncConnection, table: str, dry_run: bool) -> None:
+    """
+    Drop foreign keys of a detached partition to the partitioned tables, so partitions of the referenced
+    table can be detached too
+    """
+    query = text(
+        """
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+            AND confrelid IN (SELECT oid FROM pg_class WHERE relname = ANY(:partitioned_tables))
+        """
+    )
+    parameters = {"table": f'"{table}"', "partitioned_tables": list(PARTITIONED_TABLES)}
+    for name in (await connection.execute(query, parameters)).scalars().all():
+        await run_ddl(connection, f'ALTER TABLE "{table}" DROP CONSTRAINT "{name}"', dry_run)
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Create the missing partitions up to the months ahead and detach partitions older than the retention
+    """
+    async with engine.connect() as connection:
+        current_month = month_start((await connection.execute(text("SELECT timezone('UTC', now())"))).scalar())
+        await connection.commit()
+
+        # the referenced check partitions are created first
+        for table in reversed(PARTITIONED_TABLES):
+            existing = {partition.month for partition in await get_partitions(connection, table)}
+            for months in range(args.months_ahead + 1):
+                month = add_months(current_month, months)
+                if month not in existing:
+                    await run_ddl(connection, create_partition_sql(table, month), args.dry_run)
+
+            default_rows = await count_default_partition_rows(connection, table)
+            if default_rows:
+                logger.warning(f"{default_rows} rows of {table} are out of the range of monthly partitions")
+            await connection.commit()
+
+        if args.retention_months > 0:
+            oldest_kept = add_months(current_month, -args.retention_months)
+            # productcheck partitions go first as they reference the check ones
+            for table in PARTITIONED_TABLES:
+                for partition in await get_partitions(connection, table):
+                    if partition.month < oldest_kept:
+                        if table == "check":
+                            await run_ddl(connection, delete_check_tokens_sql(partition), args.dry_run)
+                        await run_ddl(connection, detach_partition_sql(partition), args.dry_run)
+                        await drop_foreign_keys(connection, partition.name, args.dry_run)
+                await connection.commit()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=settings.CHECK_PARTITIONS_MONTHS_AHEAD)
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=settings.CHECK_PARTITIONS_RETENTION_MONTHS,
+        help="detach partitions older than this number of months, 0 keeps all",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="print the statements without running them")
+    asyncio.run(main(parser.parse_args()))
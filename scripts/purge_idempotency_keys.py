@@ -0,0 +1,37 @@
+"""
+Delete expired idempotency keys in batches, run it periodically (e.g. from cron).
+
+Usage:
+    python -m scripts.purge_idempotency_keys --batch-size 5000
+"""
+import argparse
+import asyncio
+import logging
+
+from core.session import async_session
+from db_cruds.idempotency import DBIdempotencyKeyOps
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Delete expired keys, every batch in its own short transaction
+    """
+    deleted = 0
+    while True:
+        async with async_session() as db:
+            async with db.begin():
+                batch = await DBIdempotencyKeyOps(db).delete_expired(args.batch_size)
+        deleted += batch
+        if batch < args.batch_size:
+            break
+    logger.info(f"deleted {deleted} expired idempotency keys")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
@@ -1,13 +1,13 @@
 from fastapi import HTTPException
 from starlette import status
 
+from security.password_hasher import PasswordHasher
 from security.token_handler import TokenHandler
 from db_cruds.user import DBUserOps
 from models.all_models import User
 
 from schemas.token import TokenBase, TokenType
 from schemas.user import UserRegisterQuery, UserBase, UserCreateForDB, UserLoginQuery
-from utils import verify_secret, get_password_hash
 
 
 class AuthConnector:
@@ -15,9 +15,10 @@ class AuthConnector:
     Authorization methods
     """
 
-    def __init__(self, db_connector: DBUserOps, token_handler: TokenHandler):
+    def __init__(self, db_connector: DBUserOps, token_handler: TokenHandler, password_hasher: PasswordHasher):
         self.__db_connector = db_connector
         self.__token_handler = token_handler
+        self.__password_hasher = password_hasher
 
     async def register(self, auth_details: UserRegisterQuery) -> UserBase:
         """
@@ -28,7 +29,7 @@ class AuthConnector:
         """
 
         # create user
-        hashed_password = get_password_hash(auth_details.password)
+        hashed_password = await self.__password_hasher.hash(auth_details.password)
 
         user: User = await self.__db_connector.create(
             obj_in=UserCreateForDB(
@@ -49,7 +50,7 @@ class AuthConnector:
         existing_user = await self.__db_connector.get_user_by_email(auth_details.user_email)
 
         if (existing_user is None) or (
-            not verify_secret(auth_details.password, existing_user.hashed_password)
+            not await self.__password_hasher.verify(auth_details.password, existing_user.hashed_password)
         ):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+from starlette import status
+
+from core.config import settings
+from utils import get_password_hash, verify_secret
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded worker pool,
+    so slow password checks do not block the event loop.
+    """
+
+    def __init__(self, max_workers: int, use_processes: bool = False, queue_timeout: float = 5):
+        self._max_workers = max_workers
+        self._use_processes = use_processes
+        self._queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_workers)
+        self._executor: Optional[Executor] = None
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash password
+
+        :param password: password to hash
+        :return: hashed password
+        """
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_secret: str, hashed_password: str) -> bool:
+        """
+        Verify password
+
+        :param plain_secret: password to verify
+        :param hashed_password: hashed password
+        :return: True if verification succeed, otherwise False
+        """
+        return await self._run(verify_secret, plain_secret, hashed_password)
+
+    def shutdown(self) -> None:
+        """
+        Stop the workers of the pool
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run the function in the pool once a worker is free.
+
+        :raises: HTTPException 503 when no worker gets free during the queue timeout.
+        """
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self._queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again later",
+                headers={"Retry-After": str(max(1, round(self._queue_timeout)))},
+            )
+
+        loop = asyncio.get_running_loop()
+        try:
+            job = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # the slot is held until the job itself is done, a cancelled caller does not free it while
+        # the job keeps running in the pool
+        job.add_done_callback(lambda _: self._release_from_worker(loop))
+        return await asyncio.wrap_future(job)
+
+    def _release_from_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Release a slot from the thread which completed the job
+        """
+        try:
+            loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            # the loop is closed, nobody waits for the slot anymore
+            pass
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self._use_processes else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self._max_workers)
+        return self._executor
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASHING_WORKERS,
+    use_processes=settings.PASSWORD_HASHING_USE_PROCESSES,
+    queue_timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT_IN_SECONDS,
+)
@@ -1,3 +1,5 @@
+import hashlib
+import time
 from datetime import timedelta
 from typing import Optional, Dict, Any
 
@@ -5,6 +7,7 @@ import jwt
 from fastapi import HTTPException
 from starlette import status
 
+from core.cache import token_payload_cache
 from core.config import settings
 from schemas.token import TokenType
 from utils import utcnow, get_expire_date
@@ -34,23 +37,33 @@ class TokenHandler:
         """
         Decode token
 
+        Successfully verified payloads are cached until the token expires,
+        so a token reused by a client is verified only once.
+
         :param token: encoded token
         :param token_type: type of token
         :raises: HTTPException when get_payload raises any exception.
         :return: decoded token payload
         """
-        try:
-            payload = self.extract_payload_from_token(token)
-        except jwt.ExpiredSignatureError:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Signature has expired")
-        except jwt.InvalidTokenError:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        except Exception as e:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
-        else:
-            if token_type and token_type.value != payload["token_type"]:
+        cache_key = hashlib.sha256(token.encode()).digest()
+        payload = token_payload_cache.get(cache_key)
+
+        if payload is None:
+            try:
+                payload = self.extract_payload_from_token(token)
+            except jwt.ExpiredSignatureError:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Signature has expired")
+            except jwt.InvalidTokenError:
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-            return payload
+            except Exception as e:
+                raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+            if "exp" in payload:
+                token_payload_cache.set(cache_key, payload, ttl=payload["exp"] - time.time())
+
+        if token_type and token_type.value != payload["token_type"]:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        return payload
 
     @staticmethod
     def get_expire_date(token_type: TokenType):
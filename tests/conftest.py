@@ -1,20 +1,23 @@
 import asyncio
-from typing import AsyncGenerator
+from contextlib import nullcontext
+from typing import AsyncGenerator, Generator, List
 
 
 import pytest
 from asgi_lifespan import LifespanManager
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db_cruds.check import DBCheckOps
 from db_cruds.product import DBProductCheckOps
 from security.auth_connector import AuthConnector
 from security.token_handler import TokenHandler
-from core.session import async_session
+from core.cache import principal_cache, public_check_cache, token_payload_cache
+from core.session import async_session, engine
 from db_cruds.user import DBUserOps
 from deps import get_auth_connector, get_user_crud, get_token_handler, get_session, get_check_crud, \
-    get_product_check_crud
+    get_product_check_crud, get_password_hasher, get_session_factory, get_read_session, get_read_session_factory
 from main import app
 
 
@@ -25,6 +28,14 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(scope="function", autouse=True)
+def clear_caches() -> Generator:
+    yield
+    public_check_cache.clear()
+    principal_cache.clear()
+    token_payload_cache.clear()
+
+
 @pytest.fixture(scope="function")
 async def db() -> AsyncGenerator:
     async with async_session() as session:
@@ -33,6 +44,19 @@ async def db() -> AsyncGenerator:
         await transaction.rollback()
 
 
+@pytest.fixture(scope="function")
+def sql_statements() -> Generator[List[str], None, None]:
+    """Collects every SQL statement sent to the database while the test runs"""
+    statements = []
+
+    def collect_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", collect_statement)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", collect_statement)
+
+
 @pytest.fixture(scope="function")
 def auth_handler() -> AuthConnector:
     return get_auth_connector()
@@ -63,13 +87,18 @@ def auth_connector(
     crud_user: DBUserOps,
     token_handler: TokenHandler,
 ) -> AuthConnector:
-    return get_auth_connector(crud_user, token_handler)
+    return get_auth_connector(crud_user, token_handler, get_password_hasher())
 
 
 @pytest.fixture(scope="function")
 async def client(db: AsyncSession) -> AsyncGenerator:
     app.dependency_overrides[get_session] = lambda: db
+    app.dependency_overrides[get_session_factory] = lambda: lambda: nullcontext(db)
+    app.dependency_overrides[get_read_session] = lambda: db
+    app.dependency_overrides[get_read_session_factory] = lambda: lambda: nullcontext(db)
 
     async with LifespanManager(app):
         async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test.example/") as async_client:
             yield async_client
+    # sessions of the next test are not bound to the transaction of this one
+    app.dependency_overrides.clear()
@@ -0,0 +1,150 @@
+import json
+import uuid
+import zlib
+from datetime import datetime
+from typing import List
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import delete, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from core.cache import public_check_cache
+from core.config import settings
+from core.enums import PaymentType
+from core.session import async_session, engine
+from db_cruds.archive import DBCheckArchiveOps
+from db_cruds.check import DBCheckOps
+from db_cruds.user import DBUserOps
+from deps import get_session_factory
+from models.all_models import Check, CheckArchive, CheckToken, ProductCheck, User
+from schemas.user import UserRegisterQuery
+from security.auth_connector import AuthConnector
+
+
+async def test_archived_check_stays_public(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+) -> None:
+    """This test checks that old checks are moved to the archive and their public page renders the same"""
+    user = await auth_connector.register(UserRegisterQuery(
+        first_name="Борис", last_name="Джонсонюк", email="test@test.com", password="12356789"
+    ))
+    check = Check(
+        token=uuid.uuid4(), type=PaymentType.CASH, amount=100, total=95, rest=5,
+        customer_id=user.user_id, created_at=datetime(2020, 3, 14, 9, 26, 53),
+    )
+    check.details.extend([
+        ProductCheck(name="first", price=10, quantity=2),
+        ProductCheck(name="second", price=25, quantity=3),
+    ])
+    check = await crud_check.create_check(check)
+    check_id, token = check.check_id, check.token
+    db.expunge_all()
+
+    public_url = f"{settings.API_PREFIX}/checks/{token.hex}/show-public"
+    response = await client.get(public_url)
+    assert response.status_code == status.HTTP_200_OK
+    page = response.text
+    public_check_cache.clear()
+
+    archive_ops = DBCheckArchiveOps(db)
+    cutoff = datetime(2021, 1, 1)
+    assert await archive_ops.count_archivable(cutoff) == 1
+    assert await archive_ops.archive_batch(cutoff, batch_size=10) == 1
+    assert await archive_ops.archive_batch(cutoff, batch_size=10) == 0
+
+    assert await crud_check.get_check(check_id) is None
+    assert not (await db.execute(select(ProductCheck).where(ProductCheck.check_id == check_id))).all()
+    assert (await db.execute(select(CheckToken).where(CheckToken.token == token))).first() is None
+    archived = (await db.execute(select(CheckArchive).where(CheckArchive.token == token))).scalar_one()
+    assert archived.check_id == check_id
+    assert len(json.loads(zlib.decompress(archived.payload))["products"]) == 2
+
+    response = await client.get(public_url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == page
+
+
+async def test_drop_many_in_batches(
+        auth_connector: AuthConnector,
+        crud_user: DBUserOps,
+        sql_statements: List[str],
+) -> None:
+    """This test checks that drop_many deletes rows by statements of the batch size"""
+    user_ids = []
+    for number in range(5):
+        user = await auth_connector.register(UserRegisterQuery(
+            first_name="Борис", last_name="Джонсонюк", email=f"test{number}@test.com", password="12356789"
+        ))
+        user_ids.append(user.user_id)
+
+    sql_statements.clear()
+    await crud_user.drop_many(user_ids, batch_size=2)
+    assert len([statement for statement in sql_statements if statement.startswith("DELETE")]) == 3
+    for user_id in user_ids:
+        assert await crud_user.get(user_id) is None
+
+
+async def test_archive_conflict_keeps_the_check(
+        db: AsyncSession,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+) -> None:
+    """This test checks that a check whose archive row cannot be written is not deleted"""
+    user = await auth_connector.register(UserRegisterQuery(
+        first_name="Борис", last_name="Джонсонюк", email="test@test.com", password="12356789"
+    ))
+    check = Check(
+        token=uuid.uuid4(), type=PaymentType.CASH, amount=100, total=95, rest=5,
+        customer_id=user.user_id, created_at=datetime(2020, 3, 14, 9, 26, 53),
+    )
+    check.details.append(ProductCheck(name="first", price=95, quantity=1))
+    check = await crud_check.create_check(check)
+    check_id = check.check_id
+    db.add(CheckArchive(
+        check_id=check_id, token=uuid.uuid4(), customer_id=user.user_id, created_at=check.created_at, payload=b"",
+    ))
+    await db.flush()
+    db.expunge_all()
+
+    with pytest.raises(IntegrityError):
+        async with db.begin_nested():
+            await DBCheckArchiveOps(db).archive_batch(datetime(2021, 1, 1), batch_size=10)
+
+    assert await crud_check.get_check(check_id) is not None
+
+
+async def test_drop_many_in_transactions() -> None:
+    """This test checks that drop_many_in_transactions commits every batch of deleted rows"""
+    async with async_session() as session:
+        users = [
+            User(first_name="Борис", last_name="Джонсонюк", email=f"{uuid.uuid4().hex}@test.com", hashed_password="")
+            for _ in range(5)
+        ]
+        session.add_all(users)
+        await session.commit()
+    user_ids = [user.user_id for user in users]
+
+    commits = 0
+
+    def count_commit(connection) -> None:
+        nonlocal commits
+        commits += 1
+
+    event.listen(engine.sync_engine, "commit", count_commit)
+    try:
+        await DBUserOps.drop_many_in_transactions(get_session_factory(), user_ids, batch_size=2)
+    finally:
+        event.remove(engine.sync_engine, "commit", count_commit)
+        async with async_session() as session:
+            remaining = (await session.execute(select(User.user_id).where(User.user_id.in_(user_ids)))).scalars().all()
+            await session.execute(delete(User).where(User.user_id.in_(user_ids)))
+            await session.commit()
+
+    assert commits == 3
+    assert remaining == []
@@ -1,15 +1,25 @@
 import datetime
+import uuid
 from typing import Dict
 
+import pytest
+from fastapi import HTTPException
 from httpx import AsyncClient
 from pydantic import EmailStr
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from security.auth_connector import AuthConnector
+from core.cache import principal_cache, token_payload_cache
 from core.config import settings
+from core.session import async_session
 from db_cruds.user import DBUserOps
-from schemas.user import UserRegisterQuery, UserBase
+from models.all_models import User
+from schemas.token import TokenType
+from schemas.user import UserRegisterQuery, UserBase, UserLoginQuery, UserUpdate
+from security.token_handler import TokenHandler
+from utils import encode_cursor, utcnow
 
 
 async def test_user_register_flow(
@@ -79,3 +89,131 @@ async def test_unregistered_user_login(
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+
+
+async def test_principal_cache_invalidation(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+        crud_user: DBUserOps
+) -> None:
+    """This test checks that the cached principal is dropped when the user is updated"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    user = await auth_connector.register(UserRegisterQuery(**payload))
+    token = await auth_connector.login(UserLoginQuery(user_email=email, password=password))
+
+    response = await client.get(
+        f"{settings.API_PREFIX}/checks/my-checks", headers={"Authorization": f"Bearer {token.access_token}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert principal_cache.get(user.user_id).first_name == payload["first_name"]
+
+    await crud_user.update(await crud_user.get(user.user_id), UserUpdate(first_name="Boris"))
+    assert principal_cache.get(user.user_id) is None
+
+
+async def test_principal_cache_invalidated_after_commit() -> None:
+    """This test checks that a principal cached before the change of its user is committed is dropped by the commit"""
+
+    async with async_session() as session:
+        user = User(first_name="Борис", last_name="Джонсонюк", email=f"{uuid.uuid4().hex}@test.com", hashed_password="")
+        session.add(user)
+        await session.commit()
+    try:
+        async with async_session() as session:
+            crud_user = DBUserOps(session)
+            await crud_user.update(await crud_user.get(user.user_id), UserUpdate(first_name="Boris"))
+            # a concurrent request reads the old row before the update is committed
+            principal_cache.set(user.user_id, "old principal")
+            await session.commit()
+        assert principal_cache.get(user.user_id) is None
+
+        async with async_session() as session:
+            crud_user = DBUserOps(session)
+            await crud_user.drop(user.user_id)
+            await session.rollback()
+            principal_cache.set(user.user_id, "principal")
+            await session.commit()
+        # a rolled back change does not invalidate the principal of a later commit
+        assert principal_cache.get(user.user_id) == "principal"
+    finally:
+        async with async_session() as session:
+            await session.execute(delete(User).where(User.user_id == user.user_id))
+            await session.commit()
+
+
+async def test_decode_token_cache(token_handler: TokenHandler) -> None:
+    """This test checks that only valid tokens are cached and only until they expire"""
+
+    access_token, _ = token_handler.encode_token(TokenType.AUTH_ACCESS, 1)
+    payload = token_handler.decode_token(access_token, token_type=TokenType.AUTH_ACCESS)
+    assert payload["sub"] == 1
+    assert token_payload_cache.stats()["size"] == 1
+
+    # the cached payload is still checked against the required token type
+    with pytest.raises(HTTPException) as exc_info:
+        token_handler.decode_token(access_token, token_type=TokenType.AUTH_REFRESH)
+    assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+    assert token_payload_cache.stats()["hits"] == 1
+
+    expired_payload = token_handler.build_token_pyload(TokenType.AUTH_ACCESS, 1)
+    expired_payload["exp"] = utcnow() - datetime.timedelta(minutes=1)
+    expired_token = token_handler.build_token(expired_payload)
+    for token in [expired_token, access_token[:-2]]:
+        with pytest.raises(HTTPException) as exc_info:
+            token_handler.decode_token(token)
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+    assert token_payload_cache.stats()["size"] == 1
+
+
+async def test_users_list_pagination(
+    db: AsyncSession,
+    client: AsyncClient,
+    auth_connector: AuthConnector,
+    crud_user: DBUserOps,
+) -> None:
+    """This test checks keyset pagination, filters and page size cap of the users list"""
+
+    for index in range(3):
+        await auth_connector.register(UserRegisterQuery(
+            first_name="Борис" if index < 2 else "Джон",
+            last_name="Джонсонюк",
+            email=f"test{index}@test.com",
+            password="12356789",
+        ))
+
+    list_url = f"{settings.API_PREFIX}/auth/list/"
+    response = await client.get(list_url, params={"size": 2})
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert [user["email"] for user in first_page["items"]] == ["test0@test.com", "test1@test.com"]
+    assert first_page["next_cursor"] is not None
+
+    response = await client.get(list_url, params={"size": 2, "cursor": first_page["next_cursor"]})
+    second_page = response.json()
+    assert [user["email"] for user in second_page["items"]] == ["test2@test.com"]
+    assert second_page["next_cursor"] is None
+
+    response = await client.get(list_url, params={"first_name": "Борис"})
+    assert [user["email"] for user in response.json()["items"]] == ["test0@test.com", "test1@test.com"]
+
+    response = await client.get(list_url, params={"size": settings.USERS_PAGE_MAX_SIZE + 1})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = await client.get(list_url, params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = await client.get(list_url, params={"cursor": encode_cursor({"after": "abc"})})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    streamed = [user.email async for user in crud_user.stream_list(filters={"last_name": "Джонсонюк"}, batch_size=2)]
+    assert streamed == ["test0@test.com", "test1@test.com", "test2@test.com"]
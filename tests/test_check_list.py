@@ -1,6 +1,10 @@
-from datetime import datetime
+import csv
+import io
+import json
+from datetime import datetime, timedelta
 
 from httpx import AsyncClient
+from sqlalchemy import text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
@@ -9,8 +13,10 @@ from core.enums import PaymentType
 from db_cruds.check import DBCheckOps
 from db_cruds.product import DBProductCheckOps
 from db_cruds.user import DBUserOps
+from models.all_models import Check
 from schemas.user import UserRegisterQuery, UserLoginQuery
 from security.auth_connector import AuthConnector
+from utils import utcnow
 
 
 async def test_list_of_checks_created_by_user(
@@ -95,3 +101,263 @@ async def test_list_of_checks_created_by_user(
     assert response.status_code == status.HTTP_200_OK
     resp = response.json()
 
+
+
+async def test_list_of_checks_cursor_pagination(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+        crud_user: DBUserOps,
+) -> None:
+    """This test checks walking through user's checks with next and previous cursors"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    await auth_connector.register(UserRegisterQuery(**payload))
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+    headers = {"Authorization": f"Bearer {token.access_token}"}
+
+    create_url = f"{settings.API_PREFIX}/checks/"
+    created_check_ids = []
+    for price in [10, 20, 30]:
+        payload = {
+            "products": [{"name": f"product {price}", "price": price, "quantity": 1}],
+            "payment": {"type": PaymentType.CASH, "amount": price}
+        }
+        response = await client.post(create_url, json=payload, headers=headers)
+        assert response.status_code == status.HTTP_201_CREATED
+        created_check_ids.append(response.json()["check_id"])
+
+    # checks are created in one transaction, so they share created_at and check_id breaks the tie
+    newest_first = list(reversed(created_check_ids))
+    list_url = f"{settings.API_PREFIX}/checks/my-checks"
+
+    response = await client.get(list_url, params={"size": 2}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert [check["check_id"] for check in first_page["items"]] == newest_first[:2]
+    assert first_page["previous_cursor"] is None
+    assert first_page["next_cursor"]
+
+    response = await client.get(list_url, params={"size": 2, "cursor": first_page["next_cursor"]}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    second_page = response.json()
+    assert [check["check_id"] for check in second_page["items"]] == newest_first[2:]
+    assert second_page["next_cursor"] is None
+    assert second_page["previous_cursor"]
+
+    response = await client.get(list_url, params={"size": 2, "cursor": second_page["previous_cursor"]}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [check["check_id"] for check in response.json()["items"]] == newest_first[:2]
+
+    response = await client.get(list_url, params={"size": 2, "page": 2}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [check["check_id"] for check in response.json()["items"]] == newest_first[2:]
+
+    response = await client.get(list_url, params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_list_of_checks_date_range(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+) -> None:
+    """This test checks from/to range filtering of user's checks with timezone aware bounds"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    await auth_connector.register(UserRegisterQuery(**payload))
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+    headers = {"Authorization": f"Bearer {token.access_token}"}
+
+    check_ids = []
+    for day in [1, 2, 3]:
+        payload = {
+            "products": [{"name": "some product", "price": 10, "quantity": 1}],
+            "payment": {"type": PaymentType.CASH, "amount": 10}
+        }
+        response = await client.post(f"{settings.API_PREFIX}/checks/", json=payload, headers=headers)
+        check_id = response.json()["check_id"]
+        check_ids.append(check_id)
+        await db.execute(update(Check).where(Check.check_id == check_id).values(created_at=datetime(2024, 1, day, 10)))
+
+    list_url = f"{settings.API_PREFIX}/checks/my-checks"
+
+    async def listed(params: dict) -> list:
+        response = await client.get(list_url, params=params, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        return [check["check_id"] for check in response.json()["items"]]
+
+    assert await listed({"from": "2024-01-02T00:00:00", "to": "2024-01-03T00:00:00"}) == [check_ids[1]]
+    assert await listed({"from": "2024-01-02T10:00:00"}) == [check_ids[2], check_ids[1]]
+    assert await listed({"to": "2024-01-02T10:00:00"}) == [check_ids[0]]
+    # 11:30 at UTC+2 is 09:30 UTC
+    assert await listed({"from": "2024-01-02T11:30:00+02:00", "to": "2024-01-03T11:30:00+02:00"}) == [check_ids[1]]
+    # deprecated parameter keeps its name meaning: checks created after the day
+    assert await listed({"greater_than_date": "2024-01-01"}) == [check_ids[2], check_ids[1]]
+
+    response = await client.get(list_url, params={"from": "2024-01-03", "to": "2024-01-02"}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_list_of_checks_date_range_on_server_not_in_utc(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+) -> None:
+    """This test checks that checks are stored and filtered in UTC whatever the TimeZone of the database session is"""
+
+    await db.execute(text("SET LOCAL TIME ZONE 'Asia/Tokyo'"))
+    email = "test@test.com"
+    password = "12356789"
+    await auth_connector.register(UserRegisterQuery(
+        first_name="Борис", last_name="Джонсонюк", email=email, password=password
+    ))
+    token = await auth_connector.login(UserLoginQuery(user_email=email, password=password))
+    headers = {"Authorization": f"Bearer {token.access_token}"}
+
+    payload = {
+        "products": [{"name": "some product", "price": 10, "quantity": 1}],
+        "payment": {"type": PaymentType.CASH, "amount": 10}
+    }
+    response = await client.post(f"{settings.API_PREFIX}/checks/", json=payload, headers=headers)
+    check_id = response.json()["check_id"]
+
+    now = utcnow()
+    params = {"from": (now - timedelta(minutes=5)).isoformat(), "to": (now + timedelta(minutes=5)).isoformat()}
+    response = await client.get(f"{settings.API_PREFIX}/checks/my-checks", params=params, headers=headers)
+    assert [check["check_id"] for check in response.json()["items"]] == [check_id]
+
+
+async def test_list_of_checks_search_by_product_name(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+) -> None:
+    """This test checks ranked and paginated search of user's checks by product names"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    await auth_connector.register(UserRegisterQuery(**payload))
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+    headers = {"Authorization": f"Bearer {token.access_token}"}
+
+    check_ids = {}
+    for products in [["Milk", "Bread"], ["Chocolate milk"], ["Apples"], ["Milkshake", "Bread"]]:
+        payload = {
+            "products": [{"name": name, "price": 10, "quantity": 1} for name in products],
+            "payment": {"type": PaymentType.CASH, "amount": 10 * len(products)}
+        }
+        response = await client.post(f"{settings.API_PREFIX}/checks/", json=payload, headers=headers)
+        check_ids[", ".join(products)] = response.json()["check_id"]
+
+    list_url = f"{settings.API_PREFIX}/checks/my-checks"
+    response = await client.get(list_url, params={"search": "milk"}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    found = [check["check_id"] for check in response.json()["items"]]
+    # "milk" is a whole word of the first two checks, word_similarity 1, the newest first as they tie,
+    # it is only a part of "Milkshake", word_similarity 0.8
+    assert found == [check_ids["Chocolate milk"], check_ids["Milk, Bread"], check_ids["Milkshake, Bread"]]
+
+    response = await client.get(list_url, params={"search": "milk", "size": 2}, headers=headers)
+    first_page = response.json()
+    assert [check["check_id"] for check in first_page["items"]] == found[:2]
+    response = await client.get(
+        list_url, params={"search": "milk", "size": 2, "cursor": first_page["next_cursor"]}, headers=headers
+    )
+    second_page = response.json()
+    assert [check["check_id"] for check in second_page["items"]] == found[2:]
+    assert second_page["next_cursor"] is None
+
+    response = await client.get(
+        list_url, params={"search": "milk", "size": 2, "cursor": second_page["previous_cursor"]}, headers=headers
+    )
+    assert [check["check_id"] for check in response.json()["items"]] == found[:2]
+
+    # a cursor of the plain listing has no rank
+    response = await client.get(list_url, params={"size": 1}, headers=headers)
+    response = await client.get(
+        list_url, params={"search": "milk", "cursor": response.json()["next_cursor"]}, headers=headers
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = await client.get(list_url, params={"search": "mi"}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_export_checks(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+) -> None:
+    """This test checks streaming export of user's checks as NDJSON and CSV"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    await auth_connector.register(UserRegisterQuery(**payload))
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+    headers = {"Authorization": f"Bearer {token.access_token}"}
+
+    orders = [
+        {
+            "products": [{"name": "some product", "price": 20, "quantity": 2}],
+            "payment": {"type": PaymentType.CASH, "amount": 40}
+        },
+        {
+            "products": [{"name": "A", "price": 150, "quantity": 3}, {"name": "B", "price": 1, "quantity": 5}],
+            "payment": {"type": PaymentType.CASHLESS, "amount": 460}
+        },
+    ]
+    created_check_ids = []
+    for order in orders:
+        response = await client.post(f"{settings.API_PREFIX}/checks/", json=order, headers=headers)
+        assert response.status_code == status.HTTP_201_CREATED
+        created_check_ids.append(response.json()["check_id"])
+
+    export_url = f"{settings.API_PREFIX}/checks/export"
+    response = await client.get(export_url, params={"format": "ndjson"}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [check["check_id"] for check in exported] == created_check_ids
+    assert [check["products"] for check in exported] == [order["products"] for order in orders]
+
+    response = await client.get(export_url, params={"format": "csv", "payment_type": "cashless"}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["product"] for row in rows] == ["A", "B"]
+    assert {row["check_id"] for row in rows} == {str(created_check_ids[1])}
+    assert rows[0]["total"] == "455.00"
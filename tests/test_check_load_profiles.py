@@ -0,0 +1,106 @@
+import uuid
+from typing import List
+
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.enums import CheckLoadProfile, PaymentType
+from db_cruds.check import DBCheckOps
+from models.all_models import Check, ProductCheck
+from schemas.user import UserRegisterQuery
+from security.auth_connector import AuthConnector
+
+
+async def _create_check(db: AsyncSession, auth_connector: AuthConnector, crud_check: DBCheckOps) -> int:
+    user = await auth_connector.register(UserRegisterQuery(
+        first_name="Борис", last_name="Джонсонюк", email="test@test.com", password="12356789"
+    ))
+    check = Check(
+        token=uuid.uuid4(), type=PaymentType.CASH,
+        amount=100, total=95, rest=5, customer_id=user.user_id,
+    )
+    check.details.extend([
+        ProductCheck(name="first", price=10, quantity=2),
+        ProductCheck(name="second", price=25, quantity=3),
+    ])
+    check = await crud_check.create_check(check)
+    # forget loaded objects, so every profile is read from the database
+    db.expunge_all()
+    return check.check_id
+
+
+async def test_check_mapping_loads_no_relationships(
+        db: AsyncSession,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+        sql_statements: List[str],
+) -> None:
+    """This test checks that the generic get of a check does not touch products and customer and refuses to load them"""
+    check_id = await _create_check(db, auth_connector, crud_check)
+
+    sql_statements.clear()
+    check = await crud_check.get(check_id)
+    assert len(sql_statements) == 1
+    assert "JOIN" not in sql_statements[0]
+    assert "productcheck" not in sql_statements[0]
+    with pytest.raises(InvalidRequestError):
+        check.details
+    with pytest.raises(InvalidRequestError):
+        check.customer
+
+
+async def test_check_load_profiles_sql(
+        db: AsyncSession,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+        sql_statements: List[str],
+) -> None:
+    """This test checks statements emitted by every loading profile"""
+    check_id = await _create_check(db, auth_connector, crud_check)
+
+    sql_statements.clear()
+    check = await crud_check.get_check(check_id, CheckLoadProfile.SUMMARY)
+    assert len(sql_statements) == 1
+    assert "JOIN" not in sql_statements[0]
+    assert "productcheck" not in sql_statements[0]
+    with pytest.raises(InvalidRequestError):
+        check.details
+    db.expunge_all()
+
+    sql_statements.clear()
+    check = await crud_check.get_check(check_id, CheckLoadProfile.DETAILED)
+    assert len(sql_statements) == 2
+    assert "JOIN" not in sql_statements[0]
+    assert "FROM productcheck" in sql_statements[1]
+    assert "IN" in sql_statements[1]
+    assert sorted(product.name for product in check.details) == ["first", "second"]
+    with pytest.raises(InvalidRequestError):
+        check.customer
+    db.expunge_all()
+
+    sql_statements.clear()
+    check = await crud_check.get_check(check_id, CheckLoadProfile.FULL)
+    assert len(sql_statements) == 2
+    assert 'JOIN "user"' in sql_statements[0]
+    assert "FROM productcheck" in sql_statements[1]
+    assert len(check.details) == 2
+    assert check.customer.first_name == "Борис"
+
+
+async def test_check_schema_queries_per_profile(
+        db: AsyncSession,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+        sql_statements: List[str],
+) -> None:
+    """This test checks that a check schema costs the check row with the customer name and one products query"""
+    check_id = await _create_check(db, auth_connector, crud_check)
+
+    sql_statements.clear()
+    check = await crud_check.get_with_collected_details(check_id=check_id)
+    assert len(sql_statements) == 2
+    assert 'JOIN "user"' in sql_statements[0]
+    assert "FROM productcheck" in sql_statements[1]
+    assert len(check.products) == 2
+    assert check.customer_name == "Борис Джонсонюк"
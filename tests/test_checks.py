@@ -1,14 +1,27 @@
+import asyncio
+import uuid
 from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List
 
-from httpx import AsyncClient
+from asgi_lifespan import LifespanManager
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from core.cache import principal_cache
 from core.config import settings
 from core.enums import PaymentType
+from core.session import async_session
+from core.validation_messages import IDEMPOTENCY_KEY_REUSED, NOT_ENOUGH_MONEY
 from db_cruds.check import DBCheckOps
+from db_cruds.group_commit import CheckGroupCommitter
 from db_cruds.product import DBProductCheckOps
 from db_cruds.user import DBUserOps
+from deps import get_check_group_committer, get_read_session, get_session_factory
+from main import app
+from models.all_models import Check, ProductCheck, User
 from schemas.user import UserRegisterQuery, UserLoginQuery
 from security.auth_connector import AuthConnector
 
@@ -141,8 +154,9 @@ async def test_create_check(
 
     assert created_check.check_id == resp["check_id"]
     assert datetime.fromisoformat(resp["created_at"]) is not None
-    assert created_check.token == resp["token"] and created_check.token
-    assert created_check.url == resp["url"] and created_check.url
+    assert created_check.token.hex == resp["token"]
+    # the url is not stored, it is built from the token
+    assert resp["url"].endswith(f"/checks/{resp['token']}/show-public")
 
     check_products_details = created_check.details
     assert len(created_check.details) == 1
@@ -150,6 +164,10 @@ async def test_create_check(
     for field in payment_payload:
         assert payment_payload[field] == getattr(created_check, field)
 
+    # total and rest are stored together with the check
+    assert created_check.total == product_payload["price"] * product_payload["quantity"] == resp["total"]
+    assert created_check.rest == payment_payload["amount"] - created_check.total == resp["rest"]
+
     # We check matching between products data which are saved in database and the payload
     for saved_product_check in check_products_details:
         for field in product_payload.keys():
@@ -212,3 +230,273 @@ async def test_create_check_without_products(
     resp = response.json()
     assert resp["detail"][0]["loc"] == ['body', 'products']
     assert resp["detail"][0]['msg'] == "List should have at least 1 item after validation, not 0"
+
+
+async def test_create_checks_batch(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+        crud_product_check: DBProductCheckOps,
+) -> None:
+    """This test checks bulk creation of checks with per item errors"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    await auth_connector.register(UserRegisterQuery(**payload))
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+
+    batch_payload = [
+        {
+            "products": [{"name": "some product", "price": 20, "quantity": 2}],
+            "payment": {"type": PaymentType.CASH, "amount": 50}
+        },
+        {
+            "products": [{"name": "expensive product", "price": 100, "quantity": 1}],
+            "payment": {"type": PaymentType.CASH, "amount": 10}
+        },
+        {
+            "products": [{"name": "A", "price": 150, "quantity": 3}, {"name": "B", "price": 1, "quantity": 5}],
+            "payment": {"type": PaymentType.CASHLESS, "amount": 455}
+        },
+    ]
+    batch_url = f"{settings.API_PREFIX}/checks/batch"
+    response = await client.post(batch_url, json=batch_payload, headers={"Authorization": f"Bearer {token.access_token}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    items = response.json()["items"]
+    assert [item["index"] for item in items] == [0, 1, 2]
+
+    assert items[1]["check"] is None
+    assert items[1]["error"] == NOT_ENOUGH_MONEY
+
+    for item, order in [(items[0], batch_payload[0]), (items[2], batch_payload[2])]:
+        assert item["error"] is None
+        check = item["check"]
+        assert check["payment"] == order["payment"]
+        assert check["products"] == order["products"]
+        assert check["total"] == sum(product["price"] * product["quantity"] for product in order["products"])
+        assert check["rest"] == order["payment"]["amount"] - check["total"]
+        assert check["token"] and check["url"].endswith(f"/checks/{check['token']}/show-public")
+
+    checks = await crud_check.get_list()
+    assert sorted(check.check_id for check in checks) == [items[0]["check"]["check_id"], items[2]["check"]["check_id"]]
+
+    product_details = await crud_product_check.get_list()
+    assert len(product_details) == 3
+
+    response = await client.post(
+        f"{settings.API_PREFIX}/checks/", json=batch_payload[1], headers={"Authorization": f"Bearer {token.access_token}"}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == NOT_ENOUGH_MONEY
+
+
+async def test_create_check_idempotency_key(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+) -> None:
+    """This test checks that retries of check creation with the same idempotency key create one check"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    await auth_connector.register(UserRegisterQuery(**payload))
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+
+    payload = {
+        "products": [{"name": "some product", "price": 20, "quantity": 2}],
+        "payment": {"type": PaymentType.CASH, "amount": 50}
+    }
+    create_url = f"{settings.API_PREFIX}/checks/"
+    headers = {"Authorization": f"Bearer {token.access_token}", "Idempotency-Key": "terminal-1-order-42"}
+
+    response = await client.post(create_url, json=payload, headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert "Idempotent-Replayed" not in response.headers
+
+    retry = await client.post(create_url, json=payload, headers=headers)
+    assert retry.status_code == status.HTTP_201_CREATED
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == response.json()
+
+    checks = await crud_check.get_list()
+    assert [check.check_id for check in checks] == [response.json()["check_id"]]
+
+    # the key can not be reused for another order
+    other_payload = dict(payload, payment={"type": PaymentType.CASH, "amount": 60})
+    response = await client.post(create_url, json=other_payload, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == IDEMPOTENCY_KEY_REUSED
+
+    # requests without the key are not deduplicated
+    for _ in range(2):
+        response = await client.post(create_url, json=payload, headers={"Authorization": headers["Authorization"]})
+        assert response.status_code == status.HTTP_201_CREATED
+    assert len(await crud_check.get_list()) == 3
+
+
+async def test_create_check_money_is_exact(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+) -> None:
+    """This test checks that money is stored in cents without float rounding errors"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    await auth_connector.register(UserRegisterQuery(**payload))
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+    headers = {"Authorization": f"Bearer {token.access_token}"}
+
+    payload = {
+        "products": [{"name": "gum", "price": 0.1, "quantity": 3}, {"name": "candy", "price": 0.2, "quantity": 2}],
+        "payment": {"type": PaymentType.CASH, "amount": 1}
+    }
+    response = await client.post(f"{settings.API_PREFIX}/checks/", json=payload, headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    resp = response.json()
+    assert resp["total"] == 0.7
+    assert resp["rest"] == 0.3
+
+    created_check = (await crud_check.get_list())[0]
+    assert created_check.total == Decimal("0.70")
+    assert created_check.rest == Decimal("0.30")
+    check_out = await crud_check.get_with_collected_details(check_id=created_check.check_id)
+    assert [str(product.price) for product in check_out.products] == ["0.10", "0.20"]
+    assert str(check_out.payment.amount) == "1.00"
+
+    payload["products"][0]["price"] = 0.125
+    response = await client.post(f"{settings.API_PREFIX}/checks/", json=payload, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_create_check_reads_principal_in_its_transaction(
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+) -> None:
+    """This test checks that a write endpoint does not open a read session to authenticate its user"""
+
+    email = "test@test.com"
+    password = "12356789"
+
+    payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+    await auth_connector.register(UserRegisterQuery(**payload))
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+    principal_cache.clear()
+
+    def no_read_session() -> None:
+        raise AssertionError("a write endpoint opened a read session")
+
+    read_session_override = app.dependency_overrides[get_read_session]
+    app.dependency_overrides[get_read_session] = no_read_session
+    try:
+        payload = {
+            "products": [{"name": "some product", "price": 20, "quantity": 2}],
+            "payment": {"type": PaymentType.CASH, "amount": 50}
+        }
+        response = await client.post(
+            f"{settings.API_PREFIX}/checks/", json=payload, headers={"Authorization": f"Bearer {token.access_token}"}
+        )
+    finally:
+        app.dependency_overrides[get_read_session] = read_session_override
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+async def test_create_check_group_commit(sql_statements: List[str]) -> None:
+    """This test checks that concurrent check creations are committed together and fail one by one"""
+
+    # every request and the committer use their own sessions and commit, like in production,
+    # so the rows are visible to other sessions and are deleted at the end
+    committer = CheckGroupCommitter(get_session_factory(), window=1, max_size=4)
+    app.dependency_overrides[get_check_group_committer] = lambda: committer
+    user_id = None
+    try:
+        async with LifespanManager(app):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test.example/") as client:
+                payload = {
+                    "first_name": "Борис",
+                    "last_name": "Джонсонюк",
+                    "email": f"{uuid.uuid4().hex}@test.com",
+                    "password": "12356789",
+                }
+                response = await client.post(f"{settings.API_PREFIX}/auth/register/", json=payload)
+                assert response.status_code == status.HTTP_201_CREATED
+                user_id = response.json()["user_id"]
+                credentials = {"user_email": payload["email"], "password": payload["password"]}
+                response = await client.post(f"{settings.API_PREFIX}/auth/login/", json=credentials)
+                headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+                create_url = f"{settings.API_PREFIX}/checks/"
+
+                def order(name: str) -> Dict[str, Any]:
+                    return {
+                        "products": [{"name": name, "price": 20, "quantity": 2}],
+                        "payment": {"type": PaymentType.CASH, "amount": 50}
+                    }
+
+                sql_statements.clear()
+                orders = [order(f"product {number}") for number in range(4)]
+                responses = await asyncio.gather(*(client.post(create_url, json=o, headers=headers) for o in orders))
+                # one multi-row insert of all checks
+                check_inserts = [statement for statement in sql_statements if statement.startswith('INSERT INTO "check"')]
+                assert len(check_inserts) == 1
+
+                sql_statements.clear()
+                # the product name of the last order does not fit the column
+                orders = [order(f"product {number}") for number in range(4, 7)] + [order("x" * 101)]
+                responses += await asyncio.gather(*(client.post(create_url, json=o, headers=headers) for o in orders))
+                # the failed multi-row insert is retried check by check
+                check_inserts = [statement for statement in sql_statements if statement.startswith('INSERT INTO "check"')]
+                assert len(check_inserts) == 5
+
+        assert [response.status_code for response in responses] == [status.HTTP_201_CREATED] * 7 + [
+            status.HTTP_422_UNPROCESSABLE_ENTITY
+        ]
+        created = [response.json() for response in responses[:7]]
+        assert [check["products"][0]["name"] for check in created] == [f"product {number}" for number in range(7)]
+        assert all(check["url"].endswith(f"/checks/{check['token']}/show-public") for check in created)
+
+        async with async_session() as session:
+            committed = (await session.execute(select(Check.check_id).where(Check.customer_id == user_id))).scalars()
+            assert sorted(committed) == sorted(check["check_id"] for check in created)
+    finally:
+        app.dependency_overrides.pop(get_check_group_committer)
+        if user_id is not None:
+            async with async_session() as session:
+                check_ids = select(Check.check_id).where(Check.customer_id == user_id)
+                await session.execute(delete(ProductCheck).where(ProductCheck.check_id.in_(check_ids)))
+                await session.execute(delete(Check).where(Check.customer_id == user_id))
+                await session.execute(delete(User).where(User.user_id == user_id))
+                await session.commit()
@@ -1,14 +1,22 @@
-from datetime import datetime
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import List
 
+import pytest
 from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from core.config import settings
 from core.enums import PaymentType
 from db_cruds.check import DBCheckOps
+from db_cruds.queries import BASE_CHECK_GET_QUERY, where_check_token
 from db_cruds.product import DBProductCheckOps
 from db_cruds.user import DBUserOps
+from models.all_models import Check, ProductCheck
 from schemas.user import UserRegisterQuery, UserLoginQuery
 from security.auth_connector import AuthConnector
 
@@ -229,3 +237,147 @@ async def test_get_check_by_token(
     assert response.headers["content-type"] == "text/html; charset=utf-8"
 
 
+
+
+async def test_get_check_statement_count(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+        sql_statements: List[str],
+):
+    """This test checks that a check is fetched by one row query plus one query of its products"""
+    email = "test@test.com"
+    password = "12356789"
+
+    user_data_payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+
+    await auth_connector.register(UserRegisterQuery(**user_data_payload))
+
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+
+    payload = {
+        "products": [
+            {"name": "some product", "price": 20, "quantity": 2},
+            {"name": "another product", "price": 5, "quantity": 3},
+        ],
+        "payment": {"type": PaymentType.CASH, "amount": 60}
+    }
+
+    create_url = f"{settings.API_PREFIX}/checks/"
+    response = await client.post(create_url, json=payload, headers={"Authorization": f"Bearer {token.access_token}"})
+    resp = response.json()
+
+    sql_statements.clear()
+    response = await client.get(
+        f"{settings.API_PREFIX}/checks/{resp['check_id']}", headers={"Authorization": f"Bearer {token.access_token}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    check = response.json()
+    assert check["total"] == 55
+    assert check["rest"] == 5
+    assert len(check["products"]) == 2
+    # the check row and its products, the user of the token is cached since the check creation
+    assert len(sql_statements) == 2
+    server_timing = response.headers["Server-Timing"]
+    assert 'desc="2 statements"' in server_timing
+    assert "db-slowest;dur=" in server_timing
+
+    sql_statements.clear()
+    response = await client.get(f"{settings.API_PREFIX}/checks/{resp['token']}/show-public")
+    assert response.status_code == status.HTTP_200_OK
+    # the check row and its products
+    assert len(sql_statements) == 2
+
+
+async def test_get_check_by_token_cached(
+        db: AsyncSession,
+        client: AsyncClient,
+        auth_connector: AuthConnector,
+        sql_statements: List[str],
+):
+    """This test checks that repeated views of a public check are served from the cache"""
+    email = "test@test.com"
+    password = "12356789"
+
+    user_data_payload = {
+        "first_name": "Борис",
+        "last_name": "Джонсонюк",
+        "email": email,
+        "password": password,
+    }
+
+    await auth_connector.register(UserRegisterQuery(**user_data_payload))
+
+    credentials = {"user_email": email, "password": password}
+    token = await auth_connector.login(UserLoginQuery(**credentials))
+
+    payload = {
+        "products": [{"name": "some product", "price": 20, "quantity": 2}],
+        "payment": {"type": PaymentType.CASH, "amount": 40}
+    }
+
+    create_url = f"{settings.API_PREFIX}/checks/"
+    response = await client.post(create_url, json=payload, headers={"Authorization": f"Bearer {token.access_token}"})
+    public_url = f"{settings.API_PREFIX}/checks/{response.json()['token']}/show-public"
+
+    response = await client.get(public_url)
+    assert response.status_code == status.HTTP_200_OK
+    assert "immutable" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+    page = response.text
+
+    sql_statements.clear()
+    response = await client.get(public_url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] == etag
+    assert response.text == page
+
+    response = await client.get(public_url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not response.content
+    assert len(sql_statements) == 0
+
+    # the cache counters are exported with the other metrics, not on the public API
+    response = await client.get(f"{settings.API_PREFIX}/checks/public-cache/stats")
+    assert response.status_code != status.HTTP_200_OK
+    response = await client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert 'cache_size{cache="public_check"} 1' in response.text
+    assert 'cache_misses{cache="public_check"} 1' in response.text
+    assert 'cache_hits{cache="public_check"} 2' in response.text
+
+
+async def test_check_token_prunes_partitions(
+        db: AsyncSession,
+        auth_connector: AuthConnector,
+        crud_check: DBCheckOps,
+):
+    """This test checks that tokens are unique across months and a lookup by token reads one check partition"""
+    user = await auth_connector.register(UserRegisterQuery(
+        first_name="Борис", last_name="Джонсонюк", email="test@test.com", password="12356789"
+    ))
+    token = uuid.uuid4()
+    check = Check(token=token, type=PaymentType.CASH, amount=10, total=10, rest=0, customer_id=user.user_id)
+    check.details.append(ProductCheck(name="first", price=10, quantity=1))
+    check = await crud_check.create_check(check)
+
+    query = where_check_token(BASE_CHECK_GET_QUERY, token)
+    sql = str(query.compile(db.bind, compile_kwargs={"literal_binds": True}))
+    plan = (await db.execute(text(f"EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) {sql}"))).scalars().all()
+    check_scans = [line for line in plan if re.search(r"Scan .* on check_(p\d{6}|default) ", line)]
+    assert len(check_scans) > 1
+    assert len([line for line in check_scans if "never executed" not in line]) == 1
+    assert (await crud_check.get_with_collected_details(check_token=token)).check_id == check.check_id
+
+    with pytest.raises(IntegrityError):
+        async with db.begin_nested():
+            await crud_check.create_check(Check(
+                token=token, type=PaymentType.CASH, amount=10, total=10, rest=0, customer_id=user.user_id,
+                created_at=check.created_at - timedelta(days=40),
+            ))
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette import status
+
+from core.config import settings
+from core.pool import WaiterCountingQueuePool
+from core.session import get_engine_options
+from core.metrics import Histogram, Metric, http_requests_total, UNMATCHED_ROUTE
+
+
+def test_histogram_render() -> None:
+    """This test checks that histogram buckets are rendered cumulatively"""
+    histogram = Histogram("test_latency_seconds", "Test latency.", ("route",), buckets=(0.1, 1))
+    histogram.observe("/a", value=0.05)
+    histogram.observe("/a", value=0.5)
+    histogram.observe("/a", value=2)
+
+    assert histogram.render().splitlines() == [
+        "# HELP test_latency_seconds Test latency.",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_latency_seconds_bucket{route="/a",le="1"} 2',
+        'test_latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'test_latency_seconds_sum{route="/a"} 2.55',
+        'test_latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_metric_needs_samples() -> None:
+    """This test checks that a metric type without samples can not be created"""
+    class NoSamples(Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        NoSamples("test_metric", "Test metric.")
+
+
+async def test_pool_waiters() -> None:
+    """This test checks that callers waiting for a connection of an exhausted pool are counted"""
+    engine = create_async_engine(
+        settings.SQLALCHEMY_DATABASE_URI, **{**get_engine_options(), "pool_size": 1, "max_overflow": 0}
+    )
+    pool = engine.pool
+    assert isinstance(pool, WaiterCountingQueuePool)
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            assert pool.waiters == 0
+
+            async def second_checkout() -> int:
+                async with engine.connect() as second_connection:
+                    return (await second_connection.execute(text("SELECT 2"))).scalar()
+
+            waiting = asyncio.create_task(second_checkout())
+            await asyncio.sleep(0.1)
+            assert pool.waiters == 1
+
+        assert await waiting == 2
+        assert pool.waiters == 0
+    finally:
+        await engine.dispose()
+
+
+async def test_metrics_endpoint(client: AsyncClient) -> None:
+    """This test checks that requests are counted by route template and pool gauges are exposed"""
+    route = f"{settings.API_PREFIX}/checks/{{token}}/show-public"
+    not_found_before = http_requests_total.get("GET", route, "404")
+    unmatched_before = http_requests_total.get("GET", UNMATCHED_ROUTE, "404")
+
+    response = await client.get(f"{settings.API_PREFIX}/checks/missing-token/show-public")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await client.get("/no-such-path")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    assert http_requests_total.get("GET", route, "404") == not_found_before + 1
+    assert http_requests_total.get("GET", UNMATCHED_ROUTE, "404") == unmatched_before + 1
+
+    response = await client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert f'http_request_duration_seconds_count{{method="GET",route="{route}"}}' in body
+    assert 'db_pool_checked_out{pool="primary"}' in body
+    assert 'db_pool_waiters{pool="primary"} 0' in body
+    assert 'cache_misses{cache="public_check"}' in body
+    # the metrics request itself is in flight while rendering
+    assert 'http_requests_in_progress{method="GET"} 1' in body
@@ -0,0 +1,37 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.partitioning import add_months, is_partition_name, month_start, parse_partition_name, partition_name
+from db_cruds.check import DBCheckOps
+from models.all_models import Check
+
+
+def test_partition_names() -> None:
+    """This test checks month arithmetic and names of monthly partitions"""
+    assert month_start(datetime(2026, 10, 18, 15, 30)) == date(2026, 10, 1)
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+    assert partition_name("check", date(2026, 1, 1)) == "check_p202601"
+    partition = parse_partition_name("productcheck_p202601")
+    assert (partition.table, partition.month) == ("productcheck", date(2026, 1, 1))
+
+    assert is_partition_name("check_p202601") and is_partition_name("check_default")
+    assert not is_partition_name("check") and not is_partition_name("user_p202601")
+
+
+async def test_date_window_prunes_partitions(db: AsyncSession) -> None:
+    """This test checks that listing of a date window only scans the partitions of the window"""
+    current_month = month_start((await db.execute(text("SELECT LOCALTIMESTAMP"))).scalar())
+    date_from = datetime.combine(current_month, datetime.min.time()) + timedelta(days=1)
+    filters = dict(date_from=date_from, date_to=date_from + timedelta(days=7))
+
+    query = DBCheckOps._filter_checks_query(select(Check).where(Check.customer_id == 1), filters)
+    statement = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    plan = "\n".join((await db.execute(text(f"EXPLAIN {statement}"))).scalars())
+
+    assert partition_name("check", current_month) in plan
+    assert partition_name("check", add_months(current_month, 1)) not in plan
+    assert "check_default" not in plan
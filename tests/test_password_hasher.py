@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette import status
+
+from security.password_hasher import PasswordHasher
+
+
+async def test_password_hasher_hash_and_verify() -> None:
+    """This test checks hashing and verification in the worker pool and recreating the pool after shutdown"""
+    hasher = PasswordHasher(max_workers=2)
+    hashed_password = await hasher.hash("12356789")
+    assert await hasher.verify("12356789", hashed_password)
+    assert not await hasher.verify("987654321", hashed_password)
+
+    hasher.shutdown()
+    assert hasher._executor is None
+    # the next call starts a new pool
+    assert await hasher.verify("12356789", hashed_password)
+    hasher.shutdown()
+
+
+async def test_password_hasher_saturated() -> None:
+    """This test checks that calls waiting for a worker longer than the queue timeout get 503"""
+    hasher = PasswordHasher(max_workers=1, queue_timeout=0.1)
+    busy = asyncio.create_task(hasher._run(time.sleep, 0.5))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(HTTPException) as error:
+        await hasher._run(time.sleep, 0)
+    assert error.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert error.value.headers == {"Retry-After": "1"}
+
+    await busy
+    await hasher._run(time.sleep, 0)
+    hasher.shutdown()
+
+
+async def test_password_hasher_cancelled_call_keeps_slot() -> None:
+    """This test checks that a cancelled caller frees its worker only when the job is done"""
+    hasher = PasswordHasher(max_workers=1, queue_timeout=0.1)
+    cancelled = asyncio.create_task(hasher._run(time.sleep, 0.5))
+    await asyncio.sleep(0.05)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    # the job still runs in the only worker
+    with pytest.raises(HTTPException):
+        await hasher._run(time.sleep, 0)
+
+    await asyncio.sleep(0.5)
+    await hasher._run(time.sleep, 0)
+    hasher.shutdown()
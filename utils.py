@@ -1,5 +1,8 @@
+import base64
+import json
 import uuid
 from datetime import datetime, timezone
+from typing import Any, Dict
 
 from passlib.context import CryptContext
 
@@ -24,13 +27,22 @@ def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def random_token() -> str:
+def to_naive_utc(value: datetime) -> datetime:
     """
-    Generate random string and return it's hex representation
+    Convert datetime to naive UTC as timestamps are stored, naive values are taken as UTC already
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def random_token() -> uuid.UUID:
+    """
+    Generate random token of a check
 
-    :return: random string
+    :return: random UUID
     """
-    return uuid.uuid4().hex
+    return uuid.uuid4()
 
 
 def get_expire_date(token_type: TokenType):
@@ -60,4 +72,33 @@ def verify_secret(plain_secret: str, hashed_password: str) -> bool:
     :param hashed_password: hashed password
     :return: True if verification succeed, otherwise False
     """
-    return pwd_context.verify(plain_secret, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_secret, hashed_password)
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    """
+    Encode pagination cursor into an opaque url safe string
+
+    :param data: cursor values
+    :return: encoded cursor
+    """
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode pagination cursor produced by encode_cursor
+
+    :param cursor: encoded cursor
+    :raises: ValueError when the cursor is malformed
+    :return: cursor values
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Malformed cursor")
+    return data